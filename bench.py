@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+"""Headless frame-time benchmark of every screen.
+
+Renders each screen with the fixture weather in bench_fixtures and a
+generated photo folder on the SDL dummy driver, at the panel resolution
+and a few larger ones, and reports frame time percentiles, allocations
+and throughput. Results can be saved as a JSON baseline and compared with
+one saved on another commit:
+
+    python bench.py --save base.json
+    python bench.py --compare base.json
+"""
+
+import os, sys, json, time, shutil, tempfile, tracemalloc, argparse, subprocess, platform
+from datetime import datetime
+
+os.environ.setdefault ('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault ('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+HERE     = os.path.dirname (os.path.abspath (__file__))
+FIXTURES = os.path.join (HERE, 'bench_fixtures')
+SIZES    = ((320, 240), (480, 320), (800, 480))
+PHOTOS   = ((1600, 1200), (1200, 1600), (2000, 1000), (1024, 768))
+LOCATION = {'city': 'Hanoi', 'country': 'Vietnam', 'country_code': 'VN'}
+
+def make_fixtures (folder):
+    """Write a config.py and a folder of generated photos into folder"""
+    photos = os.path.join (folder, 'photos')
+    os.makedirs (photos, exist_ok = True)
+    for n, size in enumerate (PHOTOS):
+        img = pygame.Surface (size)
+        for y in range (0, size[1], 8):
+            img.fill ((y * 255 // size[1], (n * 60) % 256, 255 - y * 255 // size[1]), (0, y, size[0], 8))
+        pygame.draw.circle (img, (255, 255, 255), (size[0] // 2, size[1] // 2), min (size) // 3, 20)
+        pygame.image.save (img, os.path.join (photos, f'photo{n}.jpg'))
+
+    with open (os.path.join (folder, 'config.py'), 'w') as f:
+        f.write (f'latitude        = "21.03"\n'
+                 f'longitude       = "105.85"\n'
+                 f'visualcross_key = "bench"\n'
+                 f'pihole_url      = "http://127.0.0.1:9"\n'
+                 f'pihole_key      = "bench"\n'
+                 f'digiframe_dir   = {photos!r}\n'
+                 f'cache_dir       = {os.path.join (folder, "cache")!r}\n')
+
+def percentile (values, p):
+    """Nearest-rank percentile of a sorted list"""
+    return values [min (len (values) - 1, max (0, round (p / 100 * len (values)) - 1))]
+
+def measure (frame, frames, warmup, alloc_frames):
+    """Time frame (i) and sample its allocations, return the statistics"""
+    for i in range (warmup):
+        frame (i)
+
+    times = []
+    for i in range (frames):
+        t = time.perf_counter ()
+        frame (warmup + i)
+        times.append (time.perf_counter () - t)
+    times.sort ()
+
+    # transient allocation peak and blocks left allocated per frame
+    peaks, blocks = [], 0
+    tracemalloc.start ()
+    for i in range (alloc_frames):
+        before = tracemalloc.get_traced_memory () [0]
+        tracemalloc.reset_peak ()
+        snap = tracemalloc.take_snapshot () if i == 0 else None
+        frame (warmup + frames + i)
+        peaks.append (tracemalloc.get_traced_memory () [1] - before)
+        if snap is not None:
+            diff   = tracemalloc.take_snapshot ().compare_to (snap, 'filename')
+            blocks = sum (max (0, d.count_diff) for d in diff)
+    tracemalloc.stop ()
+    peaks.sort ()
+
+    mean = sum (times) / len (times)
+    return {
+        'p50_ms'       : percentile (times, 50) * 1000,
+        'p95_ms'       : percentile (times, 95) * 1000,
+        'p99_ms'       : percentile (times, 99) * 1000,
+        'mean_ms'      : mean * 1000,
+        'fps'          : 1 / mean if mean > 0 else float ('inf'),
+        'alloc_peak_kb': percentile (peaks, 50) / 1024 if peaks else 0,
+        'alloc_blocks' : blocks,
+    }
+
+def screens (screen):
+    """Return (name, frame function) of every screen for the current mode"""
+    import clock_display, forecast_display, digitalframe_display, control_display, helper
+
+    with open (os.path.join (FIXTURES, 'weather.json')) as f:
+        data = json.load (f)
+    current, days = data ['currentConditions'], data ['days']
+    start = datetime (2026, 10, 18, 10, 8, 0)
+
+    # wait for the photo loader so that photos and not the fallback are
+    # measured, the photo of the size before does not count
+    def loaded ():
+        img = digitalframe_display.img
+        return img is not None and img.get_size () == screen.get_size ()
+    digitalframe_display.draw_screen (screen, True)
+    deadline = time.monotonic () + 30
+    while not loaded ():
+        if time.monotonic () >= deadline:
+            raise SystemExit (f"No photo loaded at {screen.get_width ()}x{screen.get_height ()} within 30 seconds")
+        time.sleep (0.05)
+        digitalframe_display.draw_screen (screen)
+
+    control_display.init (screen)
+
+    # a week of hourly history for the sparklines of the clock screen
+    history = helper.get_history ()
+    if len (history) < 2:
+        for h in range (7 * 24):
+            history.add ({'temp': 25 + h % 24 / 3, 'humidity': 60 + h % 12, 'cloudcover': h * 7 % 100},
+                         now = start.timestamp () - (7 * 24 - h) * 3600)
+    touch = pygame.event.Event (pygame.MOUSEMOTION, pos = (160, 120), rel = (1, 0), buttons = (0, 0, 0))
+
+    return (
+        ('clock',        lambda i: clock_display.draw_screen (screen, datetime.fromtimestamp (start.timestamp () + i), current, LOCATION, history)),
+        ('forecast',     lambda i: forecast_display.draw_screen (screen, days, 0)),
+        ('digitalframe', lambda i: digitalframe_display.draw_screen (screen, i % 30 == 0)),
+        ('notice',       lambda i: helper.draw_notice (screen, f" Keep pressing to reboot for {5 - i // 30 % 5} seconds ...")),
+        ('control',      lambda i: control_display.draw_screen (screen, [touch] if i % 10 == 0 else [])),
+    )
+
+def compare (results, baseline, threshold):
+    """Print the change against a baseline, return True if any screen got
+       more than threshold percent slower at p95"""
+    regressed = False
+    for key, new in results.items ():
+        old = baseline.get ('results', {}).get (key)
+        if not old:
+            continue
+        change = (new ['p95_ms'] / old ['p95_ms'] - 1) * 100 if old ['p95_ms'] > 0 else 0
+        flag   = ''
+        if change > threshold:
+            flag, regressed = '  REGRESSION', True
+        print (f"{key:<24} p95 {old ['p95_ms']:8.3f} -> {new ['p95_ms']:8.3f} ms ({change:+6.1f}%){flag}")
+    return regressed
+
+def main ():
+    parser = argparse.ArgumentParser (description = "Headless frame-time benchmark of every screen")
+    parser.add_argument ('--sizes', default = ','.join (f"{w}x{h}" for w, h in SIZES),
+                         help = "comma separated WIDTHxHEIGHT list")
+    parser.add_argument ('--frames', type = int, default = 300, help = "measured frames per screen")
+    parser.add_argument ('--warmup', type = int, default = 30, help = "frames before measuring")
+    parser.add_argument ('--alloc-frames', type = int, default = 30, help = "frames traced for allocations")
+    parser.add_argument ('--save', help = "write the results as JSON baseline")
+    parser.add_argument ('--compare', help = "compare with a JSON baseline")
+    parser.add_argument ('--threshold', type = float, default = 20, help = "p95 regression in percent")
+    args = parser.parse_args ()
+
+    fixture_dir = tempfile.mkdtemp (prefix = 'piclock-bench-')
+    pygame.init ()
+    make_fixtures (fixture_dir)
+    sys.path.insert (0, fixture_dir) # the fixture config.py wins over a real one
+
+    results = {}
+    for size in args.sizes.split (','):
+        w, h   = (int (v) for v in size.split ('x'))
+        screen = pygame.display.set_mode ((w, h))
+        for name, frame in screens (screen):
+            key = f"{name}@{w}x{h}"
+            results [key] = r = measure (frame, args.frames, args.warmup, args.alloc_frames)
+            print (f"{key:<24} p50 {r ['p50_ms']:8.3f}  p95 {r ['p95_ms']:8.3f}  p99 {r ['p99_ms']:8.3f} ms"
+                   f"  {r ['fps']:9.0f} fps  alloc {r ['alloc_peak_kb']:8.1f} kB/frame  {r ['alloc_blocks']:4d} blocks kept")
+
+    try:
+        commit = subprocess.run (['git', 'rev-parse', '--short', 'HEAD'], cwd = HERE,
+                                 capture_output = True, text = True).stdout.strip ()
+    except OSError:
+        commit = ''
+    report = {
+        'meta'   : {'commit': commit, 'time': time.time (), 'python': platform.python_version (),
+                    'pygame': pygame.version.ver, 'machine': platform.machine (), 'frames': args.frames},
+        'results': results,
+    }
+
+    if args.save:
+        with open (args.save, 'w') as f:
+            json.dump (report, f, indent = 1)
+    regressed = False
+    if args.compare:
+        with open (args.compare) as f:
+            regressed = compare (results, json.load (f), args.threshold)
+
+    pygame.quit ()
+    shutil.rmtree (fixture_dir, ignore_errors = True)
+    return 1 if regressed else 0
+
+if __name__ == "__main__":
+    sys.exit (main ())
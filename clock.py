@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 
-import pygame, thorpy as tp
-from datetime import datetime, timedelta
-import math, os, threading, time
+import perf
+startup = perf.PhaseTimer () # time to first frame, reported once it is shown
+
+import pygame
+import math, os, time, http.client
 
 has_button = False
 try:
@@ -11,94 +13,130 @@ try:
 except ImportError as err:
     has_button = False
 
-import helper
-import clock_display as scr1
-import forecast_display as scr2
-import digitalframe_display as scr3
+try:
+    from config import profile
+except ImportError:
+    profile = False
+try:
+    from config import profile_export
+except ImportError:
+    profile_export = None
+try:
+    from config import frame_server # "host:port" to serve rendered frames on, headless
+except ImportError:
+    frame_server = None
+try:
+    from config import frame_size
+except ImportError:
+    frame_size = (320, 240)
+try:
+    from config import frame_source # "http://host:port" of a frame server to only show frames of
+except ImportError:
+    frame_source = None
+
+if frame_server is not None:
+    os.environ.setdefault ('SDL_VIDEODRIVER', 'dummy')
+
+import helper, timekeeper
+from scheduler import jobs
+from screens import ScreenRegistry
 
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 RED   = (255, 0, 0)
 
-CLOCK_SCR        = 0
-WEATHER_SCR      = 1
-CONTROL_SCR      = 2
-DIGITALFRAME_SCR = 3
-REBOOT_SCR       = 5
+CLOCK_SCR        = "clock"
+WEATHER_SCR      = "forecast"
+CONTROL_SCR      = "control"
+DIGITALFRAME_SCR = "digitalframe"
+REBOOT_SCR       = "reboot"
+SCREEN_CYCLE     = (CLOCK_SCR, DIGITALFRAME_SCR, CONTROL_SCR) # order button 1 switches in
+SERVED_SCR       = (CLOCK_SCR, WEATHER_SCR, DIGITALFRAME_SCR)  # screens a frame server renders
+
+startup.mark ("imports")
 
-location     = helper.get_loc_name ()
+location     = helper.get_loc_name () if frame_source is None else None
+startup.mark ("geocode")
 selected_scr = CLOCK_SCR
 old_scr      = selected_scr
 
 reboot  = False
 
-fps               = 30
+fps               = 30      # frame rate of animated screens
+INPUT_EVENTS      = (pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP,
+                     pygame.MOUSEMOTION, pygame.FINGERDOWN, pygame.FINGERUP, pygame.FINGERMOTION)
+idle_delay        = 1       # seconds between redraws of screens which did not ask for one sooner
 keytime_count_en  = False
-keytime           = 0
-boot_select_delay = 5*fps # 5 seconds
+key_pressed_at    = 0       # monotonic time the control button was pressed at, stamped at the edge
+keytime           = 0       # seconds the control button is kept pressed
+boot_select_delay = 5       # seconds
 speed             = 0       # scrolling speed
-photo_delay       = 180*fps # (3 minutes) interval to change photo frame
-photo_delay_cnt   = 0
-time_inc_cnt      = 0
-
-queried_time    = None
-queried_weather = None
-queried_fcst    = None
-res_lock       = threading.Lock()
-current_time    = datetime.now ()
-
-def update_time():
-    """Function to run in a separate thread"""
-    global queried_time
-    while True:
-        now = datetime.now ()
-        with res_lock:
-            queried_time = now
-        time.sleep (30) # every 30s
-
-def update_weather():
-    """Function to run in a separate thread"""
+photo_delay       = 180     # (3 minutes) interval to change photo frame
+photo_due         = 0       # monotonic time of the next photo change
+WAKE_EVENT        = pygame.event.custom_type () # posted by button threads to wake up the main loop
+
+WEATHER_PERIOD = 3600 # seconds between weather queries
+WEATHER_RETRY  = 60   # first retry delay after a failed query, doubled up to WEATHER_PERIOD
+FRAME_RETRY    = 5    # seconds between attempts to reach the frame server
+
+wall            = timekeeper.WallClock () # time to display, cannot drift with slow frames
+if frame_source is None:
+    queried_weather, queried_fcst, weather_age = helper.load_weather ()
+else:
+    queried_weather, queried_fcst, weather_age = None, None, None # the frame server queries it
+current_time    = wall.now ()
+
+def query_weather():
+    """Job querying the weather, raises on failure so that it is retried sooner"""
+    cur_weather, fcst_weather = helper.query_weather ()
+    if cur_weather is None:
+        raise RuntimeError ("no weather data")
+    return cur_weather, fcst_weather
+
+def apply_results ():
+    """Take over job results and button actions queued by other threads, so
+       that only the main loop changes its state. Return the monotonic time
+       of the earliest button edge among them, None if there was none."""
     global queried_weather, queried_fcst
-    while True:
-        cur_weather, fcst_weather = helper.query_weather ()
-        with res_lock:
-            queried_weather = cur_weather
-            queried_fcst    = fcst_weather if fcst_weather is not None else queried_fcst
-        time.sleep (3600) # every 1H
-
-# Start the thread of querying time
-t1 = threading.Thread (target = update_time, daemon = True)
-t2 = threading.Thread (target = update_weather, daemon = True)
-t1.start ()
-t2.start ()
-
-def on_switch_released ():
+
+    earliest = None
+    for name, value in jobs.drain ():
+        if name == "weather":
+            helper.get_history ().add (value [0])
+            queried_weather = value [0]
+            queried_fcst    = value [1] if value [1] is not None else queried_fcst
+        elif name == "button":
+            action, at = value
+            action (at)
+            earliest = at if earliest is None else min (earliest, at)
+    return earliest
+
+# keep showing the snapshot while it is fresh, retry sooner after a failure
+if frame_source is None:
+    jobs.every ("weather", query_weather, WEATHER_PERIOD, jitter = 60, retry = WEATHER_RETRY,
+                delay = WEATHER_PERIOD - weather_age if weather_age is not None and weather_age < WEATHER_PERIOD else 0)
+
+def on_switch_released (at = None):
     """Action when clock button released"""
     global selected_scr
 
-    if selected_scr == CLOCK_SCR:
-        selected_scr = DIGITALFRAME_SCR
-    elif selected_scr ==  DIGITALFRAME_SCR:
-        selected_scr = CONTROL_SCR
-    elif selected_scr == CONTROL_SCR:
-        selected_scr = CLOCK_SCR
+    if selected_scr in SCREEN_CYCLE:
+        selected_scr = SCREEN_CYCLE [(SCREEN_CYCLE.index (selected_scr) + 1) % len (SCREEN_CYCLE)]
     else:
         selected_scr = CLOCK_SCR
 
     #print ("Key 1 was clicked, switched to other screen.")
 
-def on_weather_pressed ():
+def on_weather_pressed (at = None):
     """Action when weather button pressed"""
     global selected_scr
     global old_scr
 
     old_scr = selected_scr
     selected_scr = WEATHER_SCR
-    scr2.shift = 0
-    scr2.shift_dir = False
     #print ("Key 2 was clicked, switched to WEATHER screen.")
 
-def on_weather_released ():
+def on_weather_released (at = None):
     """Action when weather button released"""
     global selected_scr
     global old_scr
@@ -106,79 +144,86 @@ def on_weather_released ():
     selected_scr = old_scr 
     #print ("Key 2 was clicked, switched to old screen.")
 
-def on_control_pressed ():
-    """Action when control button pressed"""
-    global keytime_count_en
+def on_control_pressed (at = None):
+    """Action when control button pressed, at is the monotonic time it was"""
+    global keytime_count_en, key_pressed_at
     global selected_scr
 
     keytime_count_en = True
+    key_pressed_at   = at if at is not None else time.monotonic ()
     
     if selected_scr == CLOCK_SCR:
         selected_scr = REBOOT_SCR
 
-def on_control_released ():
-    """Action when control button released"""
-    global selected_scr, has_button, keytime_count_en, keytime, speed, reboot, photo_delay_cnt
+def on_control_released (at = None):
+    """Action when control button released, at is the monotonic time it was"""
+    global selected_scr, has_button, keytime_count_en, keytime, speed, reboot, photo_due
 
     keytime_count_en = False
-    old_keytime      = keytime
+    old_keytime      = (at if at is not None else time.monotonic ()) - key_pressed_at
     keytime          = 0
 
     if selected_scr == WEATHER_SCR: # change speed if in forecast screen
         speed = speed + 1 if speed < 4 else 0
     elif selected_scr == REBOOT_SCR:
-        if old_keytime >= 180:
+        if old_keytime >= boot_select_delay:
             reboot = True
         else:
             selected_scr = CLOCK_SCR
     elif selected_scr == DIGITALFRAME_SCR: # change photo
-        photo_delay_cnt = 0
-
-pihole_sts = True
-
-if has_button:
+        photo_due = 0
+
+def wake ():
+    """Wake up the main loop at once instead of at its next scheduled redraw"""
+    try:
+        pygame.event.post (pygame.event.Event (WAKE_EVENT))
+    except pygame.error: # display not set up yet
+        pass
+
+def woken (action):
+    """Wrap a button action so that it runs in the main loop, the gpiozero
+       thread only stamps the edge with the monotonic time and queues it,
+       which wakes the main loop at once"""
+    def wrapper ():
+        jobs.post ("button", (action, time.monotonic ()))
+    return wrapper
+
+if has_button and frame_server is None:
     Clock_btn   = Button (pin = 18, pull_up = True) # GPIO18 for KEY_1
-    Clock_btn.when_released = on_switch_released
+    Clock_btn.when_released = woken (on_switch_released)
     Weather_btn = Button (pin = 23, pull_up = True) # GPIO23 for KEY_2
-    Weather_btn.when_released = on_weather_released
-    Weather_btn.when_pressed = on_weather_pressed
+    Weather_btn.when_released = woken (on_weather_released)
+    Weather_btn.when_pressed = woken (on_weather_pressed)
     Control_btn = Button (pin = 24, pull_up = True) # GPIO24 for KEY_3
-    Control_btn.when_released = on_control_released
-    Control_btn.when_pressed = on_control_pressed
+    Control_btn.when_released = woken (on_control_released)
+    Control_btn.when_pressed = woken (on_control_pressed)
 
 # setup
 pygame.init()
-screen = pygame.display.set_mode ((0,0), pygame.FULLSCREEN)
+if frame_server is not None:
+    screen = pygame.display.set_mode (frame_size) # only for converting surfaces
+else:
+    screen = pygame.display.set_mode ((0,0), pygame.FULLSCREEN)
 pygame.display.set_caption ('Clock')
 pygame.mouse.set_visible (False)
-tp.set_default_font ('Calibri', 50)
-tp.init(screen, tp.theme_game1) #bind screen to gui elements and set theme
-clock = pygame.time.Clock ()
-
-# UI for control screen
-pihole_btn = tp.SwitchButtonWithText ("Pihole", ("On", "Off"), value = 0, size = (100, 50))
-ctrl_ui    = tp.Group ([pihole_btn])
-ui_upd     = ctrl_ui.get_updater ()
-
-def draw_control_screen (screen, events):
-    """Draw a screen with control buttons"""
-    global pihole_sts
-
-    # Handle Pihole button
-    if (True if pihole_btn.get_value() == "On" else False) != pihole_sts:
-        helper.toggle_pihole (not pihole_sts)
-        pihole_sts = not pihole_sts
+jobs.notify = wake
+jobs.start ()
+startup.mark ("pygame init")
+
+running     = True
+next_redraw = 0 # monotonic time the shown screen asked to be redrawn at
+shown_scr   = None
+pushed      = perf.RateCounter () # pixels pushed to the display per second
+profiler    = perf.profiler
+profiler.enabled   = bool (profile or profile_export)
+profiler.overlay   = profile == "overlay"
+profiler.export_to = profile_export
+
+def handle_events (events, at):
+    """Act on keyboard events, keys 1 to 3 work like buttons 1 to 3, at is
+       the monotonic time the events were taken at"""
+    global running
 
-    # fill the screen with a color to wipe away anything from last frame
-    screen.fill(BLACK)
-    ui_upd.update (events = events)
-
-running = True
-
-while running:
-    # poll for events
-    # pygame.QUIT event means the user clicked X to close your window
-    events = pygame.event.get()
     for event in events:
         if event.type == pygame.QUIT:
             running = False
@@ -186,49 +231,151 @@ while running:
             if event.key == pygame.K_ESCAPE:
                 running = False
             elif event.key == pygame.K_2:
-                on_weather_pressed ()
+                on_weather_pressed (at)
             elif event.key == pygame.K_3:
-                on_control_pressed ()
+                on_control_pressed (at)
+            elif event.key == pygame.K_p and profiler.enabled: # toggle the profiling overlay
+                profiler.overlay = not profiler.overlay
+                redraw_all ()
         elif event.type == pygame.KEYUP:
             if event.key == pygame.K_1:
-                on_switch_released ()
+                on_switch_released (at)
             elif event.key == pygame.K_2:
-                on_weather_released ()
+                on_weather_released (at)
             elif event.key == pygame.K_3:
-                on_control_released ()
+                on_control_released (at)
+
+def draw_clock (scr, screen, events):
+    global current_time
+
+    current_time = wall.now ()
+    _, dirty = scr.draw_screen (screen = screen, now = current_time, weather = queried_weather, location = location,
+                                history = helper.get_history ())
+    return wall.until_next_second (), dirty
+
+def draw_forecast (scr, screen, events):
+    return scr.draw_screen (screen, queried_fcst, speed)
+
+def draw_digitalframe (scr, screen, events):
+    global photo_due
+
+    change = time.monotonic () >= photo_due
+    if change:
+        photo_due = time.monotonic () + photo_delay
+    delay, dirty = scr.draw_screen (screen, change)
+    return min (delay or photo_delay, photo_due - time.monotonic ()), dirty
+
+def draw_control (scr, screen, events):
+    # the surface holds another screen or the overlay after a switch
+    return scr.draw_screen (screen, events, redraw = switched)
+
+def draw_reboot (scr, screen, events):
+    if keytime < boot_select_delay:
+        _, dirty = helper.draw_notice (screen, f" Keep pressing to reboot for {math.ceil (boot_select_delay - keytime)} seconds ...")
+        return (boot_select_delay - keytime) % 1 or 1, dirty
+    return helper.draw_notice (screen, " Release to reboot ...")
+
+def remote_drawer (name):
+    """Draw function of a screen which only shows the frames of the server"""
+    def draw (scr, screen, events):
+        try:
+            # the surface holds another screen or the overlay after a switch
+            return remote.draw (name, screen, full = switched)
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            print ('Cannot get frame: ', e)
+            helper.draw_notice (screen, " Waiting for the frame server ...")
+            return FRAME_RETRY, None
+    return draw
+
+# each screen module is imported when first shown and released when hidden for a while
+screens = ScreenRegistry ()
+if frame_source is None:
+    screens.register (CLOCK_SCR, "clock_display", draw_clock, cadence = 1)
+    screens.register (WEATHER_SCR, "forecast_display", draw_forecast, cadence = idle_delay)
+    screens.register (DIGITALFRAME_SCR, "digitalframe_display", draw_digitalframe, cadence = photo_delay)
+else:
+    from frame_client import FrameClient
+    remote = FrameClient (frame_source)
+    for name in SERVED_SCR:
+        screens.register (name, None, remote_drawer (name), cadence = idle_delay)
+screens.register (CONTROL_SCR, "control_display", draw_control, cadence = idle_delay)
+screens.register (REBOOT_SCR, None, draw_reboot, cadence = idle_delay)
+
+if frame_server is not None:
+    # render headless on request of the clients instead of for a display
+    from frame_server import FrameServer
+    server = FrameServer (frame_server, screens, frame_size, SERVED_SCR, prepare = apply_results)
+    print (f"Serving frames of {frame_size[0]}x{frame_size[1]} on {frame_server}")
+    try:
+        server.serve_forever ()
+    except KeyboardInterrupt:
+        pass
+    server.server_close ()
+    running = False
+
+def redraw_all ():
+    """Push the whole screen at the next frame, i.e. to remove the overlay"""
+    global shown_scr
+    shown_scr = None
 
-    if reboot:
-        running = False
-        helper.draw_notice (screen, " Rebooting ...")
-    else:
-        if selected_scr == CLOCK_SCR:
-            scr1.draw_screen (screen = screen, now = current_time, weather = queried_weather, location = location)
-            if current_time < queried_time:
-                current_time = queried_time
-            else:
-                time_inc_cnt = fps - 1 if time_inc_cnt == 0 else time_inc_cnt - 1
-                if time_inc_cnt == 0:
-                    current_time += timedelta (seconds = 1)
-        elif selected_scr == WEATHER_SCR:
-            scr2.draw_screen (screen, queried_fcst, speed)
-        elif selected_scr == DIGITALFRAME_SCR:
-            scr3.draw_screen (screen, photo_delay_cnt == 0)
-            photo_delay_cnt = photo_delay if photo_delay_cnt <= 0 else photo_delay_cnt - 1
-        elif selected_scr == CONTROL_SCR:
-            draw_control_screen (screen, events)
-        elif selected_scr == REBOOT_SCR:
-            if keytime < boot_select_delay:
-                helper.draw_notice (screen, f" Keep pressing to reboot for {(boot_select_delay - keytime)//fps} seconds ...")
-            else:
-                helper.draw_notice (screen, " Release to reboot ...")
-
-    # flip() the display to put your work on screen
-    pygame.display.flip()
+while running:
+    # sleep until the shown screen needs a redraw or an input arrives
+    # pygame.QUIT event means the user clicked X to close your window
+    timeout = math.ceil ((next_redraw - time.monotonic ()) * 1000) # never wake before the second turns
+    event   = None
+    if timeout > 0 and shown_scr == selected_scr and not reboot:
+        with profiler.phase ("wait"):
+            event = pygame.event.wait (timeout)
+    woke = time.monotonic ()
+    with profiler.phase ("events"):
+        events   = ([event] if event is not None and event.type != pygame.NOEVENT else []) + pygame.event.get()
+        input_at = apply_results () # button edges are stamped when they happen
+        if any (e.type in INPUT_EVENTS for e in events):
+            input_at = min (input_at or woke, woke) # pygame events when they are taken
+        handle_events (events, woke)
 
     # count keytime
-    if keytime_count_en: keytime += 1
+    if keytime_count_en: keytime = time.monotonic () - key_pressed_at
 
-    clock.tick(fps)  # limits FPS to 60
+    with profiler.phase ("draw"):
+        delay, dirty = idle_delay, None
+        switched     = shown_scr != selected_scr or reboot
+        shown_scr    = selected_scr
+        if reboot:
+            running = False
+            delay, dirty = helper.draw_notice (screen, " Rebooting ...")
+        else:
+            delay, dirty = screens.draw (selected_scr, screen, events)
+        screens.release_idle ()
+
+        overlay = profiler.draw_overlay (screen)
+        if overlay is not None and dirty is not None:
+            dirty.append (overlay)
+
+    # put your work on screen, only the changed parts when the screen tells them
+    with profiler.phase ("flip"):
+        if switched or dirty is None:
+            pygame.display.flip()
+            pushed.add (screen.get_width () * screen.get_height ())
+        elif dirty:
+            pygame.display.update (dirty)
+            visible = [r.clip (screen.get_rect ()) for r in dirty]
+            pushed.add (sum (r.width * r.height for r in visible))
+    if input_at is not None:
+        profiler.record ("input_latency", time.monotonic () - input_at)
+
+    if startup is not None:
+        startup.mark ("first render")
+        print (startup.report ())
+        startup = None
+
+    if delay is None: delay = idle_delay
+    # limit the FPS of animated screens by waiting, so that an input still wakes the loop at once
+    next_redraw = max (time.monotonic () + max (0, delay), woke + 1 / fps)
+
+    profiler.extras ['px/s'] = round (pushed.rate ())
+    profiler.frame ()
+    profiler.export ()
 
 pygame.quit ()
 
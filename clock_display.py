@@ -1,12 +1,27 @@
 #!/usr/bin/env python
 
 import pygame
+import pygame.gfxdraw
+import fonts
+from collections import OrderedDict
 from datetime import datetime
 import math
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from config import clock_sprites
+except ImportError:
+    clock_sprites = False
+
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 RED   = (255, 0, 0)
+CYAN  = (0, 200, 255)
+GREY  = (160, 160, 160)
 
 def circle_point(center, radius, theta):
     """Calculates the location of a point of a circle given the circle's
@@ -17,9 +32,9 @@ def circle_point(center, radius, theta):
 
 def line_at_angle(screen, center, radius, theta, color, width):
     """Draws a line from a center towards an angle. The angle is given in
-       radians."""
+       radians. Returns the rectangle which was drawn on."""
     point = circle_point(center, radius, theta)
-    pygame.draw.line(screen, color, center, point, width)
+    return pygame.draw.line(screen, color, center, point, width)
 
 def get_angle(unit, total):
     """Calculates the angle, in radians, corresponding to a portion of the clock
@@ -27,129 +42,329 @@ def get_angle(unit, total):
        o'clock and moving clock-wise."""
     return 2 * math.pi * unit / total - math.pi / 2
 
-def draw_screen (screen, now = None, weather = None, location = None):
-    """Draw a screen with analog and digital clocks"""
+def circle_points(center, radius, total):
+    """Points of a circle at every unit of get_angle (unit, total), as a list
+       of (x, y) tuples so that lookups do not go through NumPy"""
+    if numpy is not None:
+        theta = 2 * numpy.pi * numpy.arange(total) / total - numpy.pi / 2
+        xs = center[0] + radius * numpy.cos(theta)
+        ys = center[1] + radius * numpy.sin(theta)
+        return list(zip(xs.tolist(), ys.tolist()))
+    return [circle_point(center, radius, get_angle(unit, total)) for unit in range(total)]
 
-    DIGITAL_H = 100 # height of digital clock
-    CLOCK_W = screen.get_width() - 5 # analog clock width
-    CLOCK_H = screen.get_height() - 5 # analog clock heigmt
-    MARGIN_H = MARGIN_W = 5 # margin of analog clock from window border
+DIGITAL_H = 100 # height of digital clock
+MARGIN_H = MARGIN_W = 5 # margin of analog clock from window border
+TICK_R = 2 # stroke width of minute markings
+HOUR_STROKE = 5 # hour hand stroke width
+MINUTE_STROKE = 2 # minute hand stroke width
+SECOND_STROKE = 2 # second hand stroke width
+CLOCK_STROKE = 2 # clock circle stroke width
+CENTER_W = 10 # clock center mount width
+CENTER_H = 10 # clock center mount height
+HOURS_IN_CLOCK = 12
+MINUTES_IN_HOUR = 60
+SECONDS_IN_MINUTE = 60
+HOUR_STEPS = HOURS_IN_CLOCK * MINUTES_IN_HOUR # the hour hand moves every minute
+SPRITE_CACHE_SIZE = 180 # number of rendered hand sprites to keep
+TREND_HOURS = 7 * 24 # span of the weather history sparklines
+TRENDS = (('temp', RED), ('humidity', CYAN), ('cloudcover', GREY)) # sparklines, top to bottom
+
+face     = None # pre-rendered dial, rebuilt only when size or theme changes
+face_key = None
+geometry = None # lookup tables of the dial, see build_geometry ()
+geometry_key = None
+sprites  = OrderedDict() # (hand, position) -> (surface, topleft), only with clock_sprites
+trends   = None # rendered sparklines, rebuilt only when a sample arrives
+trends_key = None
+
+last_size  = None # screen size of the last frame
+last_hands = None # (position, rectangle) of the hands drawn in the last frame
+last_texts = {}   # (id, rectangle) -> text surface blitted in the last frame
+
+def build_geometry (size):
+    """Compute the end points of the hands at every position they can take and
+       those of the ticks and hour labels, once per screen size"""
+
+    CLOCK_W = size[0] - 5 # analog clock width
+    CLOCK_H = size[1] - 5 # analog clock height
     CLOCK_R = (CLOCK_H - MARGIN_H) / 2 # clock radius
-    HOUR_R = CLOCK_R / 2 # hour hand length
-    MINUTE_R = CLOCK_R * 7 / 10 # minute hand length
-    SECOND_R = CLOCK_R * 8 / 10 # second hand length
-    TEXT_R = CLOCK_R * 8 / 10 # distance of hour markings from center
-    TICK_R = 2 # stroke width of minute markings
     TICK_LENGTH = CLOCK_R / 20 # stroke length of minute markings
-    HOUR_STROKE = 5 # hour hand stroke width
-    MINUTE_STROKE = 2 # minute hand stroke width
-    SECOND_STROKE = 2 # second hand stroke width
-    CLOCK_STROKE = 2 # clock circle stroke width
-    CENTER_W = 10 # clock center mount width
-    CENTER_H = 10 # clock center mount height
-    HOURS_IN_CLOCK = 12
-    MINUTES_IN_HOUR = 60
-    SECONDS_IN_MINUTE = 60
-
-    hour_font = pygame.font.SysFont ('Calibri', int(CLOCK_R / 7), True, False)
-    digital_font = pygame.font.SysFont ('Calibri', int(CLOCK_R / 5), False, False)
-    weather_font = pygame.font.SysFont ('Calibri', int(CLOCK_R / 10), False, False)
-
-    # fill the screen with a color to wipe away anything from last frame
-    screen.fill(BLACK)
 
-    if not now:
-        now = datetime.now()
+    center = (CLOCK_W / 2, CLOCK_H / 2)
+    outer  = circle_points(center, CLOCK_R, MINUTES_IN_HOUR)
+    inner  = circle_points(center, CLOCK_R - TICK_LENGTH, MINUTES_IN_HOUR)
+    inner5 = circle_points(center, CLOCK_R - TICK_LENGTH * 2, MINUTES_IN_HOUR)
 
-    c_x, c_y = CLOCK_W / 2, CLOCK_H / 2
-    center = (c_x, c_y)
+    return {
+        'center': center,
+        'hour'  : circle_points(center, CLOCK_R / 2, HOUR_STEPS),              # hour hand
+        'minute': circle_points(center, CLOCK_R * 7 / 10, MINUTES_IN_HOUR),    # minute hand
+        'second': circle_points(center, CLOCK_R * 8 / 10, SECONDS_IN_MINUTE),  # second hand
+        'labels': circle_points(center, CLOCK_R * 8 / 10, HOURS_IN_CLOCK),     # hour markings, 12 o'clock first
+        'ticks' : [(inner5[m] if m % 5 == 0 else inner[m], outer[m], TICK_R * 2 if m % 5 == 0 else TICK_R)
+                   for m in range(MINUTES_IN_HOUR)],
+    }
+
+def get_geometry (size):
+    """Return the cached lookup tables for this size, rebuilding them on change"""
+    global geometry, geometry_key
+
+    if geometry_key != size:
+        geometry     = build_geometry (size)
+        geometry_key = size
+        sprites.clear ()
+    return geometry
+
+def hand_sprite (center, point, color, width):
+    """Render an antialiased hand from center to point, return the surface and
+       where to blit it"""
+    dx, dy = point[0] - center[0], point[1] - center[1]
+    length = math.hypot(dx, dy) or 1
+    nx, ny = -dy / length * width / 2, dx / length * width / 2
+    corners = [(center[0] + nx, center[1] + ny), (point[0] + nx, point[1] + ny),
+               (point[0] - nx, point[1] - ny), (center[0] - nx, center[1] - ny)]
+
+    left = int(min(x for x, _ in corners)) - 1
+    top  = int(min(y for _, y in corners)) - 1
+    w    = int(max(x for x, _ in corners)) + 2 - left
+    h    = int(max(y for _, y in corners)) + 2 - top
+    corners = [(x - left, y - top) for x, y in corners]
 
-     # draw clock
+    surface = pygame.Surface ((w, h), pygame.SRCALPHA)
+    pygame.gfxdraw.aapolygon (surface, corners, color)
+    pygame.gfxdraw.filled_polygon (surface, corners, color)
+    return surface, (left, top)
+
+def draw_hand (screen, hand, position, color, width):
+    """Draw a hand at a position of its lookup table, return the rectangle
+       which was drawn on"""
+    center = geometry['center']
+    point  = geometry[hand][position]
+    if not clock_sprites:
+        return pygame.draw.line(screen, color, center, point, width)
+
+    key    = (hand, position)
+    sprite = sprites.get (key)
+    if sprite is None:
+        sprite = sprites [key] = hand_sprite (center, point, color, width)
+        if len(sprites) > SPRITE_CACHE_SIZE:
+            sprites.popitem (last = False)
+    else:
+        sprites.move_to_end (key)
+    return screen.blit (*sprite)
+
+def release ():
+    """Drop the dial, the lookup tables and the sprites until the screen is
+       shown again"""
+    global face, face_key, geometry, geometry_key, trends, trends_key, last_size, last_hands, last_texts
+
+    face = face_key = geometry = geometry_key = trends = trends_key = last_size = last_hands = None
+    last_texts = {}
+    sprites.clear ()
+
+def build_face (size, color = WHITE):
+    """Render the static part of the dial (circle, mount, minute ticks and hour
+       labels) once into a surface of the given screen size"""
+
+    CLOCK_H = size[1] - 5 # analog clock height
+    CLOCK_R = (CLOCK_H - MARGIN_H) / 2 # clock radius
+
+    hour_font = fonts.get_font ('Calibri', int(CLOCK_R / 7), True, False)
+
+    surface = pygame.Surface (size)
+    surface.fill (BLACK)
+
+    table  = get_geometry (size)
+    center = table['center']
+
+    # draw clock
     pygame.draw.circle(
-        screen,
-        WHITE,
+        surface,
+        color,
         center, CLOCK_H / 2 - MARGIN_H / 2,
         CLOCK_STROKE
     )
 
     # draw clock mount
     pygame.draw.circle(
-        screen,
-        WHITE,
+        surface,
+        color,
         center, CENTER_H / 2 - MARGIN_H / 2,
         CLOCK_STROKE
     )
 
-    # draw hands
-    hour_theta = get_angle(now.hour + 1.0 * now.minute / MINUTES_IN_HOUR, HOURS_IN_CLOCK)
-    minute_theta = get_angle(now.minute, MINUTES_IN_HOUR)
-    second_theta = get_angle(now.second, SECONDS_IN_MINUTE)
-
-    for (radius, theta, color, stroke) in (
-        (HOUR_R, hour_theta, WHITE, HOUR_STROKE),
-        (MINUTE_R, minute_theta, WHITE, MINUTE_STROKE),
-        (SECOND_R, second_theta, RED, SECOND_STROKE),
-    ):
-        line_at_angle(screen, center, radius, theta, color, stroke)
-
     # draw hour markings (text)
     for hour in range(1, HOURS_IN_CLOCK + 1):
-        theta = get_angle(hour, HOURS_IN_CLOCK)
-        text = hour_font.render(str(hour), True, WHITE)
-        text_rect = text.get_rect (center = circle_point(center, TEXT_R, theta))
+        text = fonts.render_text (hour_font, str(hour), color)
+        text_rect = text.get_rect (center = table['labels'][hour % HOURS_IN_CLOCK])
 
-        screen.blit (text, text_rect)
+        surface.blit (text, text_rect)
 
     # draw minute markings (lines)
-    for minute in range(0, MINUTES_IN_HOUR):
-        theta = get_angle(minute, MINUTES_IN_HOUR)
-        length = TICK_LENGTH * 2 if minute % 5 == 0 else TICK_LENGTH
-        width  = TICK_R * 2 if minute % 5 == 0 else TICK_R
-        p1 = circle_point(center, CLOCK_R - length, theta)
-        p2 = circle_point(center, CLOCK_R, theta)
-        pygame.draw.line(screen, WHITE, p1, p2, width)
+    for p1, p2, width in table['ticks']:
+        pygame.draw.line(surface, color, p1, p2, width)
+
+    return surface.convert () if pygame.display.get_surface () else surface
+
+def get_face (size, color = WHITE):
+    """Return the cached dial for this size and theme, rebuilding it on change"""
+    global face, face_key
+
+    if face_key != (size, color):
+        face     = build_face (size, color)
+        face_key = (size, color)
+    return face
+
+def trend_band (size):
+    """Free part of the dial the sparklines go into: below the location line,
+       above the 5 to 7 hour labels and between the 4 and 8 ones"""
+
+    CLOCK_W = size[0] - 5 # analog clock width
+    CLOCK_H = size[1] - 5 # analog clock height
+    CLOCK_R = (CLOCK_H - MARGIN_H) / 2 # clock radius
+    TEXT_R = CLOCK_R * 8 / 10 # distance of hour markings from center
+    c_x, c_y = CLOCK_W / 2, CLOCK_H / 2
+
+    digital_font = fonts.get_font ('Calibri', int(CLOCK_R / 5), False, False)
+    weather_font = fonts.get_font ('Calibri', int(CLOCK_R / 10), False, False)
+    label_w, label_h = fonts.get_font ('Calibri', int(CLOCK_R / 7), True, False).size("8")
+
+    top    = c_y + CLOCK_R / 2 - DIGITAL_H / 2 + digital_font.get_linesize() + weather_font.get_linesize() + 2
+    bottom = c_y + TEXT_R * math.cos(math.pi / 6) - label_h / 2 - 2 # top of the 5 and 7 labels
+    half_w = TEXT_R * math.cos(math.pi / 6) - label_w               # half a label inside the 4 and 8 ones
+    return pygame.Rect (int(c_x - half_w), int(top), int(2 * half_w), max(0, int(bottom - top)))
+
+def build_trends (size, history):
+    """Render sparklines of the last TREND_HOURS of the weather history, each
+       scaled between its own minimum and maximum, into a surface of the size
+       of trend_band ()"""
+
+    band    = trend_band (size)
+    width   = band.width
+    line_h  = band.height // len(TRENDS) - 2
+    span    = TREND_HOURS * 3600
+
+    surface = pygame.Surface (band.size, pygame.SRCALPHA)
+    if line_h < 2:
+        return surface, band.topleft # no room on such a small screen
+    end     = history.record(len(history) - 1)[0]
+    for row, (field, color) in enumerate(TRENDS):
+        samples = [(t, v) for t, v in history.series(field, end - span) if not math.isnan(v)]
+        if len(samples) < 2:
+            continue
+        low  = min(v for _, v in samples)
+        high = max(v for _, v in samples)
+        top  = row * (line_h + 2)
+        points = [((t - end + span) / span * (width - 1),
+                   top + (1 - (v - low) / ((high - low) or 1)) * (line_h - 1)) for t, v in samples]
+        pygame.draw.aalines(surface, color, False, points)
+    return surface, band.topleft
+
+def get_trends (size, history):
+    """Return the cached sparklines and where they go, rebuilding them when
+       the history changed"""
+    global trends, trends_key
+
+    key = (size, history, history.version)
+    if trends_key != key:
+        trends     = build_trends (size, history)
+        trends_key = key
+    return trends
+
+def draw_screen (screen, now = None, weather = None, location = None, history = None):
+    """Draw a screen with analog and digital clocks and the trends of the
+       weather history, return the delay in seconds until the next second is
+       due and the rectangles which changed since the last frame (None if the
+       whole screen did)"""
+    global last_size, last_hands, last_texts
+
+    CLOCK_W = screen.get_width() - 5 # analog clock width
+    CLOCK_H = screen.get_height() - 5 # analog clock heigmt
+    CLOCK_R = (CLOCK_H - MARGIN_H) / 2 # clock radius
+
+    digital_font = fonts.get_font ('Calibri', int(CLOCK_R / 5), False, False)
+    weather_font = fonts.get_font ('Calibri', int(CLOCK_R / 10), False, False)
+
+    # blit the cached dial, this also wipes away anything from last frame
+    screen.blit (get_face (screen.get_size ()), (0, 0))
+
+    if not now:
+        now = datetime.now()
+
+    c_x, c_y = CLOCK_W / 2, CLOCK_H / 2
+
+    # texts are blitted through put () to find out which of them changed
+    texts = {}
+    def put (text, pos):
+        rect = screen.blit (text, pos)
+        texts [(id(text), tuple(rect))] = text
+
+    # draw weather trends under the hands
+    if history is not None and len(history) > 1:
+        put (*get_trends (screen.get_size (), history))
+
+    # draw hands, their end points are looked up in the tables of the dial
+    get_geometry (screen.get_size ())
+    # a sprite may keep its rectangle when the hand moves, so the positions tell what moved
+    hands = [(position, draw_hand(screen, hand, position, color, stroke))
+             for (hand, position, color, stroke) in (
+        ('hour', now.hour % HOURS_IN_CLOCK * MINUTES_IN_HOUR + now.minute, WHITE, HOUR_STROKE),
+        ('minute', now.minute, WHITE, MINUTE_STROKE),
+        ('second', now.second, RED, SECOND_STROKE),
+    )]
 
     # draw digital clock
     digital_text = now.strftime('%d %b, %Y')
-    text = digital_font.render(digital_text, True, WHITE)
-    screen.blit (text, [c_x - digital_font.size(digital_text)[0] / 2, c_y + CLOCK_R / 2 - DIGITAL_H / 2 - digital_font.size(digital_text)[1] / 2])
-    loc_txt = [weather_font.render(location['city'], True, WHITE)]
+    text = fonts.render_text (digital_font, digital_text, WHITE)
+    put (text, [c_x - digital_font.size(digital_text)[0] / 2, c_y + CLOCK_R / 2 - DIGITAL_H / 2 - digital_font.size(digital_text)[1] / 2])
+    loc_txt = [fonts.render_text (weather_font, location['city'], WHITE)]
     for i in range(len(loc_txt)):
-        screen.blit (loc_txt [i], [c_x - loc_txt[i].get_rect().width / 2, c_y + CLOCK_R / 2 - DIGITAL_H / 2 + digital_font.size(digital_text)[1] + i*loc_txt[0].get_rect().height*1.2])
+        put (loc_txt [i], [c_x - loc_txt[i].get_rect().width / 2, c_y + CLOCK_R / 2 - DIGITAL_H / 2 + digital_font.size(digital_text)[1] + i*loc_txt[0].get_rect().height*1.2])
 
     # draw weather information
     if weather is not None:
         inf1_txt  = []
         for cond in weather['conditions'].split(', '):
-            inf1_txt.append (weather_font.render(cond, True, WHITE))
+            inf1_txt.append (fonts.render_text (weather_font, cond, WHITE))
 
-        inf2a_txt  = weather_font.render(f"{weather['cloudcover']}%", True, WHITE)
-        inf2b_txt  = weather_font.render(f"{weather['windspeed']}kmh", True, WHITE)
-        inf2c_txt  = weather_font.render(f"UV: {weather['uvindex']}", True, WHITE)
+        inf2a_txt  = fonts.render_text (weather_font, f"{weather['cloudcover']}%", WHITE)
+        inf2b_txt  = fonts.render_text (weather_font, f"{weather['windspeed']}kmh", WHITE)
+        inf2c_txt  = fonts.render_text (weather_font, f"UV: {weather['uvindex']}", WHITE)
         inf2_width = max ([inf2a_txt.get_rect().width, inf2b_txt.get_rect().width, inf2c_txt.get_rect().width])
-        inf3a_txt  = weather_font.render(f"T: {weather['temp']}°C", True, WHITE)
-        inf3b_txt  = weather_font.render(f"FL: {weather['feelslike']}°C", True, WHITE)
-        inf4a_txt  = weather_font.render(f"H: {weather['humidity']}%", True, WHITE)
-        inf4b_txt  = weather_font.render(f"D: {weather['dew']}%", True, WHITE)
+        inf3a_txt  = fonts.render_text (weather_font, f"T: {weather['temp']}°C", WHITE)
+        inf3b_txt  = fonts.render_text (weather_font, f"FL: {weather['feelslike']}°C", WHITE)
+        inf4a_txt  = fonts.render_text (weather_font, f"H: {weather['humidity']}%", WHITE)
+        inf4b_txt  = fonts.render_text (weather_font, f"D: {weather['dew']}%", WHITE)
         inf4_width = max ([inf4a_txt.get_rect().width, inf4b_txt.get_rect().width])
-        inf5a_txt  = weather_font.render(f"{weather['sunrise']}", True, WHITE)
-        inf5b_txt  = weather_font.render(f"{weather['sunset']}", True, WHITE)
+        inf5a_txt  = fonts.render_text (weather_font, f"{weather['sunrise']}", WHITE)
+        inf5b_txt  = fonts.render_text (weather_font, f"{weather['sunset']}", WHITE)
 
         for i in range(len(inf1_txt)):
-            screen.blit (inf1_txt [i], [2*MARGIN_W, 2*MARGIN_H + i*inf2a_txt.get_rect().height*1.2])
+            put (inf1_txt [i], [2*MARGIN_W, 2*MARGIN_H + i*inf2a_txt.get_rect().height*1.2])
 
-        screen.blit (inf2a_txt, [CLOCK_W - 2*MARGIN_W - inf2_width, 2*MARGIN_H + 0*inf2a_txt.get_rect().height*1.2])
-        screen.blit (inf2b_txt, [CLOCK_W - 2*MARGIN_W - inf2_width, 2*MARGIN_H + 1*inf2a_txt.get_rect().height*1.2])
-        screen.blit (inf2c_txt, [CLOCK_W - 2*MARGIN_W - inf2_width, 2*MARGIN_H + 2*inf2a_txt.get_rect().height*1.2])
+        put (inf2a_txt, [CLOCK_W - 2*MARGIN_W - inf2_width, 2*MARGIN_H + 0*inf2a_txt.get_rect().height*1.2])
+        put (inf2b_txt, [CLOCK_W - 2*MARGIN_W - inf2_width, 2*MARGIN_H + 1*inf2a_txt.get_rect().height*1.2])
+        put (inf2c_txt, [CLOCK_W - 2*MARGIN_W - inf2_width, 2*MARGIN_H + 2*inf2a_txt.get_rect().height*1.2])
 
-        screen.blit (inf3a_txt, [2*MARGIN_W, CLOCK_H - 2*MARGIN_H - 2*inf3a_txt.get_rect().height*1.2])
-        screen.blit (inf3b_txt, [2*MARGIN_W, CLOCK_H - 2*MARGIN_H -   inf3a_txt.get_rect().height*1.2])
+        put (inf3a_txt, [2*MARGIN_W, CLOCK_H - 2*MARGIN_H - 2*inf3a_txt.get_rect().height*1.2])
+        put (inf3b_txt, [2*MARGIN_W, CLOCK_H - 2*MARGIN_H -   inf3a_txt.get_rect().height*1.2])
 
-        screen.blit (inf4a_txt, [CLOCK_W - 2*MARGIN_W - inf4_width, CLOCK_H - 2*MARGIN_H - 2*inf4a_txt.get_rect().height*1.2])
-        screen.blit (inf4b_txt, [CLOCK_W - 2*MARGIN_W - inf4_width, CLOCK_H - 2*MARGIN_H -   inf4a_txt.get_rect().height*1.2])
+        put (inf4a_txt, [CLOCK_W - 2*MARGIN_W - inf4_width, CLOCK_H - 2*MARGIN_H - 2*inf4a_txt.get_rect().height*1.2])
+        put (inf4b_txt, [CLOCK_W - 2*MARGIN_W - inf4_width, CLOCK_H - 2*MARGIN_H -   inf4a_txt.get_rect().height*1.2])
 
-        screen.blit (inf5a_txt, [c_x - inf5a_txt.get_rect().width / 2, c_y - CLOCK_R / 2.5 - inf5a_txt.get_rect().height*1.1])
-        screen.blit (inf5b_txt, [c_x - inf5a_txt.get_rect().width / 2, c_y - CLOCK_R / 2.5 + inf5a_txt.get_rect().height*0.1])
+        put (inf5a_txt, [c_x - inf5a_txt.get_rect().width / 2, c_y - CLOCK_R / 2.5 - inf5a_txt.get_rect().height*1.1])
+        put (inf5b_txt, [c_x - inf5a_txt.get_rect().width / 2, c_y - CLOCK_R / 2.5 + inf5a_txt.get_rect().height*0.1])
     else:
-        inf5a_txt  = weather_font.render("No info", True, WHITE)
-        screen.blit (inf5a_txt, [c_x - inf5a_txt.get_rect().width / 2, c_y - CLOCK_R / 2.5 - inf5a_txt.get_rect().height*1.1])
+        inf5a_txt  = fonts.render_text (weather_font, "No info", WHITE)
+        put (inf5a_txt, [c_x - inf5a_txt.get_rect().width / 2, c_y - CLOCK_R / 2.5 - inf5a_txt.get_rect().height*1.1])
+
+    # find what changed, the old and new places of moved hands and texts
+    if last_size != screen.get_size () or last_hands is None:
+        dirty = None
+    else:
+        dirty = [old [1].union (new [1]) for old, new in zip (last_hands, hands) if old != new]
+        dirty += [pygame.Rect (rect) for (_, rect) in texts.keys () ^ last_texts.keys ()]
+    # keeping the surfaces referenced guarantees their ids are not reused
+    last_size, last_hands, last_texts = screen.get_size (), hands, texts
+
+    return 1 - now.microsecond / 1000000, dirty
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+import pygame, thorpy as tp
+import time
+import helper
+from scheduler import jobs
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+RED   = (255, 0, 0)
+
+UI_FRAME     = 1 / 30 # redraw delay while thorpy reacts to an input
+ACTIVE_DELAY = 0.5    # seconds to keep animating after an input
+POINTER      = (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION,
+                pygame.FINGERDOWN, pygame.FINGERUP, pygame.FINGERMOTION) # inputs thorpy reacts to
+
+pihole_sts   = True # status the switch shows
+pihole_btn   = None
+ui_upd       = None
+active_until = 0    # monotonic time thorpy stops animating after the last input
+
+def init (screen):
+    """Bind thorpy to the screen and build the control UI"""
+    global pihole_btn, ui_upd
+
+    tp.set_default_font ('Calibri', 50)
+    tp.init(screen, tp.theme_game1) #bind screen to gui elements and set theme
+
+    pihole_btn = tp.SwitchButtonWithText ("Pihole", ("On", "Off"), value = 0, size = (100, 50))
+    ctrl_ui    = tp.Group ([pihole_btn])
+    ui_upd     = ctrl_ui.get_updater ()
+    show_pihole (pihole_sts)
+
+    helper.get_pihole ().start (jobs)
+
+def release ():
+    """Drop the UI, init () builds it again"""
+    global pihole_btn, ui_upd
+
+    pihole_btn = ui_upd = None
+
+def show_pihole (status):
+    """Move the switch to the given status without toggling Pi-hole"""
+    global pihole_sts
+
+    pihole_btn.switch.value = 0 if status else 1 # texts are ("On", "Off")
+    pihole_btn.switch.refresh_dragger_pos ()
+    pihole_sts = status
+
+def draw_screen (screen, events, redraw = False):
+    """Draw a screen with control buttons, return the delay until its next
+       redraw and the rectangles which changed (None if all did). thorpy
+       animates for a while after an input and is not run at all when
+       nothing happened; redraw draws anyway, i.e. after a screen switch."""
+    global pihole_sts, active_until
+
+    # Handle Pihole button, the request is sent in the background
+    changed = False
+    pihole  = helper.get_pihole ()
+    if (True if pihole_btn.get_value() == "On" else False) != pihole_sts:
+        helper.toggle_pihole (not pihole_sts)
+        pihole_sts = not pihole_sts
+    elif pihole.status is not None and pihole.status != pihole_sts and not pihole.pending ():
+        show_pihole (pihole.status) # changed on the server or first poll
+        changed = True
+
+    now = time.monotonic ()
+    if any (e.type in POINTER for e in events):
+        active_until = now + ACTIVE_DELAY
+    elif not (changed or redraw) and now >= active_until:
+        return None, [] # nothing happened, the screen is as it was
+
+    # fill the screen with a color to wipe away anything from last frame
+    screen.fill(BLACK)
+    ui_upd.update (events = events)
+    return (UI_FRAME if now < active_until else None), None
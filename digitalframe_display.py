@@ -1,41 +1,167 @@
 #!/usr/bin/env python
 
 import pygame
-import os, random
+import threading, queue, time
 from config import digiframe_dir
+import helper, photo_decode
+from photo_index import PhotoIndex, ShuffleBag
+from thumb_cache import ThumbCache
+try:
+    from config import thumb_cache_mb
+except ImportError:
+    thumb_cache_mb = 512
 
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 RED   = (255, 0, 0)
 
-img = None
+MARGIN_H = MARGIN_W = 5 # margin of photo from window border
+PREFETCH = 2            # number of prepared photos waiting to be shown
+RESCAN   = 600          # seconds between delta scans of the photo folder
+NO_PHOTO = 10           # seconds between looks into a missing or empty folder
+
+img          = None                            # photo currently shown
+photo_queue  = queue.Queue (maxsize = PREFETCH) # (size, surface) ready to blit
+target_size  = None                            # screen size the loader prepares for
+loader       = None
+loader_lock  = threading.Lock ()
+stop         = threading.Event ()              # set by release () to end the loader
+want_change  = False
+no_photos    = False                           # the loader found nothing to show
+shown        = None                            # (photo or None, size) shown in the last frame
+library      = None
+shuffled     = None
+last_scan    = None
+thumbs       = None
+
+def next_photo ():
+    """Pick the next photo of the shuffled library, rescanning the folder for
+       changes every RESCAN seconds. Returns its name in the library, None if
+       there is none which can be shown."""
+    global library, shuffled, last_scan
+
+    if library is None:
+        library  = PhotoIndex (digiframe_dir, helper.cache_path ("photo_index.json"))
+        shuffled = ShuffleBag (library)
+    if last_scan is None or time.monotonic () - last_scan > RESCAN or len (library) == 0:
+        added, removed = library.scan ()
+        if added or removed:
+            library.save ()
+        last_scan = time.monotonic ()
+
+    return next (shuffled, None)
+
+def get_thumbs ():
+    """Return the on-disk cache of display-sized photos"""
+    global thumbs
+
+    if thumbs is None:
+        thumbs = ThumbCache (helper.cache_path ("thumbs"), thumb_cache_mb * 1024 * 1024)
+    return thumbs
+
+def fit_size (size):
+    """Area of the screen a photo is scaled into"""
+    return (size[0] - 5, size[1] - 5)
+
+def scale_photo (path, fit):
+    """Decode a photo and scale it, keeping its aspect, to fit into fit,
+       see photo_decode.load_scaled ()"""
+    return photo_decode.load_scaled (path, fit)
+
+def prepare_photo (path, size):
+    """Compose a photo, scaled to fit and centered, on a black surface of the
+       given screen size"""
+    SCR_W, SCR_H = fit_size (size)
+    photo        = get_thumbs ().get (path, (SCR_W, SCR_H), scale_photo)
+    sw, sh       = photo.get_size ()
+
+    frame = pygame.Surface (size)
+    frame.fill (BLACK)
+    frame.blit (photo, [MARGIN_W + (SCR_W - sw) / 2, MARGIN_H + (SCR_H - sh) / 2])
+    return frame.convert () if pygame.display.get_surface () else frame
+
+def load_photos ():
+    """Function to run in a separate thread, keeps the photo queue filled
+       until release () is called"""
+    global loader, library, shuffled, last_scan, thumbs, no_photos
+
+    frame = None
+    while True:
+        with loader_lock:
+            if stop.is_set ():
+                # drop everything prepared, start_loader () starts afresh
+                loader = library = shuffled = last_scan = thumbs = None
+                while not photo_queue.empty ():
+                    photo_queue.get_nowait ()
+                return
+        if frame is not None:
+            try:
+                photo_queue.put (frame, timeout = 1) # waits while the queue is full
+                frame = None
+            except queue.Full:
+                pass
+            continue
+
+        size      = target_size
+        name      = next_photo ()
+        no_photos = name is None
+        if no_photos:
+            stop.wait (NO_PHOTO) # folder missing, empty or every photo failed, look again later
+            continue
+        path = library.path (name)
+        try:
+            frame = (size, prepare_photo (path, size))
+        except Exception as e:
+            print ('Cannot load photo: ', path, e)
+            library.fail (name) # skipped until the file changes
+
+def start_loader (size):
+    """Start the photo loader thread for the given screen size, if not yet"""
+    global loader, target_size
+
+    target_size = size
+    with loader_lock:
+        stop.clear () # keeps a loader which was asked to stop running
+        if loader is None:
+            loader = threading.Thread (target = load_photos, daemon = True)
+            loader.start ()
+
+def release ():
+    """Stop the loader and drop the shown photo, the loader releases the
+       library and the prepared photos when it stops"""
+    global img, shown, want_change
+
+    stop.set ()
+    img = shown = None
+    want_change = False
 
 def draw_screen (screen, change = False):
-    """Draw a screen with new randomized photo if change == True"""
-    global img
+    """Draw a screen with new randomized photo if change == True, return a
+       short delay while waiting for the loader, None otherwise, and the
+       rectangles which changed since the last frame (None if all did)"""
+    global img, want_change, shown
 
-    SCR_W    = screen.get_width()  - 5
-    SCR_H    = screen.get_height() - 5
-    MARGIN_H = MARGIN_W = 5 # margin of analog clock from window border
+    start_loader (screen.get_size ())
 
-    if change:
+    want_change = want_change or change or img is None or img.get_size () != screen.get_size ()
+    if want_change:
         try:
-            filename = random.choice(os.listdir(digiframe_dir))
-        except:
-            filename = None
+            size, frame = photo_queue.get_nowait ()
+            if size == screen.get_size ():
+                img         = frame
+                want_change = False
+        except queue.Empty:
+            pass # keep the current photo until the next one is ready
 
-        if filename is not None:
-            path = os.path.join(digiframe_dir, filename)
-            try:
-                img = pygame.image.load(path)
-                img.convert ()
-            except:
-                img = None
-
-    # fill the screen with a color to wipe away anything from last frame
-    screen.fill(BLACK)
-    if img is not None:
-        iw, ih = img.get_size ()
-        r = (SCR_W / iw) if iw > ih else (SCR_H / ih)
-        img = pygame.transform.scale(img, [iw * r, ih * r])
-        screen.blit (img, [MARGIN_W + (SCR_W - iw) / 2, MARGIN_H + (SCR_H - ih) / 2])
+    if img is not None and img.get_size () == screen.get_size ():
+        screen.blit (img, (0, 0))
+    else:
+        screen.fill (BLACK) # nothing prepared yet
+
+    # the placeholder too is only pushed once
+    dirty = [] if shown is not None and shown [0] is img and shown [1] == screen.get_size () else None
+    shown = (img, screen.get_size ())
+
+    if not want_change:
+        return None, dirty
+    return (NO_PHOTO if no_photos else 0.1), dirty
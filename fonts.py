@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+import pygame
+from collections import OrderedDict
+
+TEXT_CACHE_SIZE = 256 # number of rendered text surfaces to keep
+
+fonts      = {}            # (name, size, bold, italic) -> pygame.font.Font
+text_cache = OrderedDict() # (font, text, color, antialias) -> pygame.Surface
+stats      = {'font_hits': 0, 'font_misses': 0, 'text_hits': 0, 'text_misses': 0, 'text_evictions': 0}
+
+def get_font (name, size, bold = False, italic = False):
+    """Return a font from the shared registry, looking it up only once"""
+    key = (name, int(size), bool(bold), bool(italic))
+    font = fonts.get (key)
+    if font is None:
+        stats ['font_misses'] += 1
+        font = pygame.font.SysFont (name, int(size), bold, italic)
+        fonts [key] = font
+    else:
+        stats ['font_hits'] += 1
+    return font
+
+def render_text (font, text, color, antialias = True):
+    """Render a text with the given font, reusing the surface if the same text
+       was rendered recently. Returned surfaces are shared, do not draw on them."""
+    key = (font, text, tuple(color), antialias)
+    surface = text_cache.get (key)
+    if surface is None:
+        stats ['text_misses'] += 1
+        surface = font.render (text, antialias, color)
+        text_cache [key] = surface
+        if len(text_cache) > TEXT_CACHE_SIZE:
+            text_cache.popitem (last = False)
+            stats ['text_evictions'] += 1
+    else:
+        stats ['text_hits'] += 1
+        text_cache.move_to_end (key)
+    return surface
+
+def cache_stats ():
+    """Return a copy of the hit/miss counters together with the cache sizes"""
+    return dict (stats, fonts = len(fonts), texts = len(text_cache))
+
+def clear ():
+    """Drop all cached fonts and text surfaces, i.e. after pygame.font.quit()"""
+    fonts.clear ()
+    text_cache.clear ()
@@ -1,64 +1,131 @@
 #!/usr/bin/env python
 
 import pygame
+import fonts
 from datetime import datetime as date
-import math
-import helper
+import time
 
 BLACK  = (0, 0, 0)
 WHITE  = (255, 255, 255)
 RED    = (255, 0, 0)
 YELLOW = (255, 255, 0)
 
-shift     = 0
+ROWS        = 7
+COLS        = 5
+SCROLL_RATE = 1.5 # characters per second at the lowest speed
+MAX_STEP    = 0.1 # longest time step of the scrolling, i.e. after a stall
+
+shift     = 0      # scroll position in characters, 0 shows the first column
 shift_dir = False
+last_tick = None   # monotonic time of the last scroll step
+shown     = None   # (screen size, forecast) of the last frame
+offset    = None   # table column shown at the screen left in the last frame
+table     = None   # pre-rendered table, see build_table ()
+table_key = None
 
-def draw_screen (screen, fcst_weather = None, speed = 0):
-    """Draw a screen with weather information"""
+def show ():
+    """Start scrolling from the first column whenever the screen is shown"""
     global shift, shift_dir
 
-    SCR_W    = screen.get_width()  - 5
-    SCR_H    = screen.get_height() - 5
-    MARGIN_H = MARGIN_W = 5 # margin of analog clock from window border
+    shift     = 0
+    shift_dir = False
+
+def release ():
+    """Drop the pre-rendered table until the screen is shown again"""
+    global shown, offset, table, table_key
+
+    shown = offset = table = table_key = None
 
-    # fill the screen with a color to wipe away anything from last frame
-    screen.fill(BLACK)
+def build_table (size, fcst_weather):
+    """Render the whole forecast table once into a surface wider than the
+       screen, with one character of room at the left for the bounce. Returns
+       the surface, the character width and the scroll range in characters."""
+    SCR_W    = size[0] - 5
+    SCR_H    = size[1] - 5
+    MARGIN_H = MARGIN_W = 5 # margin of analog clock from window border
 
-    weather_font   = pygame.font.SysFont ('Calibri', int((SCR_H / 7)*0.6), False, False)
-    row_h          = (SCR_H - 2*MARGIN_H) / 7
+    weather_font   = fonts.get_font ('Calibri', int((SCR_H / 7)*0.6), False, False)
+    row_h          = (SCR_H - 2*MARGIN_H) / ROWS
     char_w, char_h = weather_font.size("a")
 
-    tbl     = [['' for c in range(5)] for r in range(7)]
-    max_len = [0 for c in range(5)]
+    tbl     = [['' for c in range(COLS)] for r in range(ROWS)]
+    max_len = [0 for c in range(COLS)]
+
+    for i in range(min (len(fcst_weather), ROWS)):
+        tbl [i][0] = date.strptime(fcst_weather[i]['datetime'], "%Y-%m-%d").date().strftime("%a") if i > 0 else "Today"
+        tbl [i][1] = 'Fl: '    + str(fcst_weather[i]['feelslike']) + '°C'
+        tbl [i][2] = 'H: '     + str(fcst_weather[i]['humidity']) + '%'
+        tbl [i][3] = 'Cloud: ' + str(fcst_weather[i]['cloudcover']) + '%'
+        tbl [i][4] = fcst_weather[i]['conditions']
+
+        for c in range(COLS):
+            max_len [c] = max (max_len [c], len (tbl [i][c]))
+
+    max_shift = sum (max_len) - ((SCR_W - MARGIN_W) / char_w)
+    surface   = pygame.Surface ((char_w + MARGIN_W + sum (max_len)*char_w + size[0], size[1]))
+    surface.fill (BLACK)
+
+    col_x = 0
+    for c in range(COLS):
+        for r in range(ROWS):
+            if tbl [r][c]:
+                text = weather_font.render (tbl [r][c], True, WHITE)
+                surface.blit (text, [char_w + MARGIN_W + col_x, MARGIN_H + r*row_h + (row_h - char_h)/2])
+        col_x += max_len [c]*char_w
+    for r in range(1, ROWS):
+        pygame.draw.line (surface, YELLOW, [0, MARGIN_H + r*row_h], [surface.get_width (), MARGIN_H + r*row_h], 2)
+
+    if pygame.display.get_surface ():
+        surface = surface.convert ()
+    return surface, char_w, max_shift
+
+def draw_screen (screen, fcst_weather = None, speed = 0):
+    """Draw a screen with weather information, return the time until the
+       scrolling table moves by a pixel (None if it does not scroll) and the
+       rectangles which changed since the last frame (None if all did)"""
+    global shift, shift_dir, last_tick, shown, offset, table, table_key
+
+    SCR_H    = screen.get_height() - 5
+    MARGIN_H = MARGIN_W = 5 # margin of analog clock from window border
+
+    scrolling = False
+    moved     = False
+    now       = time.monotonic ()
+    step      = min (now - last_tick, MAX_STEP) if last_tick is not None else 0
+    last_tick = now
 
     if fcst_weather:
-        for i in range(len(fcst_weather)):
-            tbl [i][0] = date.strptime(fcst_weather[i]['datetime'], "%Y-%m-%d").date().strftime("%a") if i > 0 else "Today"
-            tbl [i][1] = 'Fl: '    + str(fcst_weather[i]['feelslike']) + '°C'
-            tbl [i][2] = 'H: '     + str(fcst_weather[i]['humidity']) + '%'
-            tbl [i][3] = 'Cloud: ' + str(fcst_weather[i]['cloudcover']) + '%'
-            tbl [i][4] = fcst_weather[i]['conditions']
-
-            if max_len [0] < len (tbl [i][0]): max_len [0] = len (tbl [i][0])
-            if max_len [1] < len (tbl [i][1]): max_len [1] = len (tbl [i][1])
-            if max_len [2] < len (tbl [i][2]): max_len [2] = len (tbl [i][2])
-            if max_len [3] < len (tbl [i][3]): max_len [3] = len (tbl [i][3])
-            if max_len [4] < len (tbl [i][4]): max_len [4] = len (tbl [i][4])
-
-        for r in range(7):
-            for c in range(5):
-                text = weather_font.render(tbl [r][c], True, WHITE)
-                screen.blit (text, [MARGIN_W + sum(max_len[:c])*char_w + shift*char_w, MARGIN_H + r*row_h + (row_h - char_h)/2])
-                if r > 0:
-                    pygame.draw.line (screen, YELLOW, [0, MARGIN_H + r*row_h], [SCR_W, MARGIN_H + r*row_h], 2)
-
-        max_shift = sum (max_len) - ((SCR_W - MARGIN_W) / char_w)
+        if table_key is None or table_key [0] != screen.get_size () or table_key [1] is not fcst_weather:
+            table     = build_table (screen.get_size (), fcst_weather)
+            table_key = (screen.get_size (), fcst_weather)
+        surface, char_w, max_shift = table
+
         if max_shift <= 0:
             shift = 0
         else:
-            shift = (shift - 0.05*(speed+1)) if not shift_dir else (shift + 0.05*(speed+1))
+            scrolling = True
+            shift = (shift - SCROLL_RATE*(speed+1)*step) if not shift_dir else (shift + SCROLL_RATE*(speed+1)*step)
             if shift <= (0-max_shift) or shift >= 1:
+                shift     = min (max (shift, 0-max_shift), 1)
                 shift_dir = not shift_dir
+
+        # the whole frame is the part of the table at the scroll position
+        moved  = offset != round (char_w - shift*char_w)
+        offset = round (char_w - shift*char_w)
+        screen.blit (surface, (0, 0), pygame.Rect (offset, 0, screen.get_width (), screen.get_height ()))
     else:
-        text = weather_font.render("No info available.", True, WHITE)
+        weather_font = fonts.get_font ('Calibri', int((SCR_H / 7)*0.6), False, False)
+        text = fonts.render_text (weather_font, "No info available.", WHITE)
+        # fill the screen with a color to wipe away anything from last frame
+        screen.fill(BLACK)
         screen.blit (text, [MARGIN_W, MARGIN_H])
+
+    if shown is None or shown [0] != screen.get_size () or shown [1] is not fcst_weather:
+        dirty = None
+    elif moved:
+        dirty = [pygame.Rect (0, MARGIN_H, screen.get_width (), SCR_H - 2*MARGIN_H)]
+    else:
+        dirty = []
+    shown = (screen.get_size (), fcst_weather)
+
+    return (1 / (SCROLL_RATE*(speed+1)*char_w) if scrolling else None), dirty
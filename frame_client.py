@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+import pygame
+import http.client, urllib.parse, struct, time, zlib
+import perf
+from frame_server import decode_rects
+
+class FrameClient:
+    """Shows the frames of a FrameServer over one keep-alive connection.
+
+       Only the rectangles changed since the frame shown last are fetched, so
+       the surface must not be drawn on by anything else in between; ask for
+       the whole frame with full = True after it was."""
+
+    def __init__ (self, url, timeout = 2):
+        parts        = urllib.parse.urlsplit (url)
+        self.https   = parts.scheme == 'https'
+        self.host    = parts.hostname
+        self.port    = parts.port
+        self.path    = parts.path.rstrip ('/') + '/frame/'
+        self.timeout = timeout
+        self.conn    = None
+        self.shown   = None # (screen, token) of the frame on the surface
+
+    def connect (self):
+        if self.conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conn = cls (self.host, self.port, timeout = self.timeout)
+        return self.conn
+
+    def draw (self, name, surface, full = False):
+        """Fetch what changed on a screen and blit it, return the delay until
+           the server renders its next frame and the rectangles which changed
+           (None if all did)"""
+        since = self.shown [1] if self.shown is not None and self.shown [0] == name and not full else ''
+        query = urllib.parse.urlencode ({'since': since})
+        start = time.perf_counter ()
+        try:
+            conn = self.connect ()
+            conn.request ('GET', f"{self.path}{urllib.parse.quote (name)}?{query}")
+            response = conn.getresponse ()
+            body     = response.read () # read it all so that the connection can be reused
+            if response.status != 200:
+                raise OSError (f"HTTP {response.status}")
+            token = response.getheader ('X-Frame')
+            delay = float (response.getheader ('X-Frame-Delay', '1'))
+
+            try:
+                rects = list (decode_rects (body))
+            except (struct.error, zlib.error) as e:
+                raise ValueError (f"bad frame: {e}")
+
+            dirty = []
+            for rect, pixels in rects:
+                surface.blit (pygame.image.frombuffer (pixels, rect.size, 'RGB'), rect)
+                dirty.append (rect)
+        except (OSError, ValueError, http.client.HTTPException):
+            # drop the connection and what is shown, the next request starts afresh
+            if self.conn is not None:
+                self.conn.close ()
+                self.conn = None
+            self.shown = None
+            raise
+        finally:
+            perf.profiler.record ('frame_fetch', time.perf_counter () - start)
+
+        self.shown = (name, token)
+        return delay, (None if not since else dirty)
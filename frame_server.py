@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import pygame
+import http.server, urllib.parse, collections, struct, threading, time, zlib, os
+import perf
+
+RECT    = struct.Struct ('<HHHH') # x, y, width, height, then width*height RGB bytes
+HISTORY = 16                      # frames a client may lag behind and still get a delta
+
+def encode_rects (surface, rects):
+    """Pack the pixels of some rectangles of a surface, compressed"""
+    parts = []
+    for rect in rects:
+        parts.append (RECT.pack (rect.x, rect.y, rect.width, rect.height))
+        parts.append (pygame.image.tobytes (surface.subsurface (rect), 'RGB'))
+    return zlib.compress (b''.join (parts), 1)
+
+def decode_rects (body):
+    """Unpack what encode_rects () packed, as (rectangle, RGB bytes) pairs"""
+    data = zlib.decompress (body)
+    pos  = 0
+    while pos < len (data):
+        x, y, w, h = RECT.unpack_from (data, pos)
+        pos       += RECT.size
+        yield pygame.Rect (x, y, w, h), data [pos:pos + w * h * 3]
+        pos       += w * h * 3
+
+class ScreenFrames:
+    """Last frame of a screen rendered by the server, with the rectangles the
+       frames before it changed so that clients get only what they miss"""
+
+    def __init__ (self, size):
+        self.surface = pygame.Surface (size)
+        self.seq     = 0
+        self.due     = 0                                       # monotonic time the next frame is due
+        self.history = collections.deque (maxlen = HISTORY)    # (seq, changed rectangles or None if all)
+        self.encoded = {}                                      # since -> body, for the current frame
+
+    def add (self, dirty):
+        """Take a frame drawn on surface, dirty as returned by the screen"""
+        area = self.surface.get_rect ()
+        if dirty is not None:
+            dirty = [r.clip (area) for r in map (pygame.Rect, dirty)]
+            dirty = [r for r in dirty if r.width and r.height]
+        self.seq += 1
+        self.history.append ((self.seq, dirty))
+        self.encoded = {}
+
+    def changes (self, since):
+        """Rectangles changed after frame since, None if the whole frame has to
+           be sent"""
+        if since is None or since > self.seq or since < self.seq - len (self.history):
+            return None
+        rects = []
+        for seq, dirty in self.history:
+            if seq > since:
+                if dirty is None:
+                    return None
+                rects += dirty
+        area = self.surface.get_width () * self.surface.get_height ()
+        return rects if sum (r.width * r.height for r in rects) < area // 2 else None
+
+    def encode (self, since):
+        """Body bringing a client from frame since to the current one, shared
+           by all clients which are at the same frame"""
+        rects = self.changes (since)
+        key   = None if rects is None else since
+        body  = self.encoded.get (key)
+        if body is None:
+            body = self.encoded [key] = encode_rects (self.surface, [self.surface.get_rect ()] if rects is None else rects)
+        return body
+
+class FrameHandler (http.server.BaseHTTPRequestHandler):
+    """GET /frame/<screen>?since=<X-Frame of the frame the client shows>"""
+
+    protocol_version = 'HTTP/1.1' # keep the connection of a client open
+
+    def do_GET (self):
+        parts = urllib.parse.urlsplit (self.path)
+        name  = parts.path [len ('/frame/'):] if parts.path.startswith ('/frame/') else None
+        if name not in self.server.names:
+            self.send_error (404)
+            return
+        since = urllib.parse.parse_qs (parts.query).get ('since', [''])[0]
+        token, delay, body = self.server.frame (name, since)
+
+        self.send_response (200)
+        self.send_header ('Content-Type', 'application/octet-stream')
+        self.send_header ('Content-Length', str (len (body)))
+        self.send_header ('X-Frame', token)
+        self.send_header ('X-Frame-Delay', f"{delay:.3f}")
+        self.end_headers ()
+        self.wfile.write (body)
+
+    def log_message (self, format, *args):
+        pass # one line per frame otherwise
+
+class FrameServer (http.server.ThreadingHTTPServer):
+    """Serves frames of screens rendered headless, so that one renderer can
+       feed many thin clients, see FrameClient.
+
+       A screen is only rendered when a client asks for it and its last frame
+       is older than the delay the screen asked for, i.e. the clock once per
+       second however many clients show it. A client which tells the frame it
+       shows gets only the rectangles changed since, else the whole frame.
+       prepare () is called before rendering, to take over job results."""
+
+    daemon_threads = True
+
+    def __init__ (self, address, screens, size, names, prepare = None):
+        host, port = address.rsplit (':', 1)
+        super ().__init__ ((host, int (port)), FrameHandler)
+        self.screens = screens
+        self.size    = size
+        self.names   = names
+        self.prepare = prepare
+        self.lock    = threading.Lock ()       # screens are drawn one at a time
+        self.epoch   = f"{os.getpid ():x}{int (time.time ()):x}" # tells clients the server restarted
+        self.frames  = {}                       # name -> ScreenFrames
+
+    def frame (self, name, since):
+        """Return the token of the current frame of a screen, the delay until
+           the next one is due and the body bringing a client from the frame
+           with token since to it"""
+        start = time.perf_counter ()
+        with self.lock:
+            frames = self.frames.get (name)
+            if frames is None:
+                frames = self.frames [name] = ScreenFrames (self.size)
+            if time.monotonic () >= frames.due:
+                if self.prepare is not None:
+                    self.prepare ()
+                delay, dirty = self.screens.draw (name, frames.surface, [], show = False)
+                frames.add (dirty)
+                frames.due = time.monotonic () + (delay if delay is not None else 1)
+                self.screens.release_idle ()
+
+            epoch, _, seq = since.partition (':')
+            body  = frames.encode (int (seq) if epoch == self.epoch and seq.isdigit () else None)
+            token = f"{self.epoch}:{frames.seq}"
+            delay = max (0, frames.due - time.monotonic ())
+        perf.profiler.record ('frame_request', time.perf_counter () - start)
+        return token, delay, body
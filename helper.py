@@ -1,46 +1,107 @@
 #!/usr/bin/env python3
 
-import pygame
-import urllib.request, json
-import reverse_geocode
-from config import latitude, longitude, visualcross_key, pihole_url, pihole_key
+import fonts, perf
+import json, os, time
+from weather_client import WeatherClient, save_snapshot, load_snapshot
+from pihole_client import PiholeClient
+from weather_history import WeatherHistory
+try:
+    from config import cache_dir
+except ImportError:
+    cache_dir = os.path.expanduser ("~/.cache/piclock")
+try:
+    from config import weather_timeout
+except ImportError:
+    weather_timeout = 10
 
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 RED   = (255, 0, 0)
 
+weather = None # created by get_weather () on first use, frame clients never query
+
+def get_weather ():
+    """Return the weather client, reading the location and key on first use"""
+    global weather
+
+    if weather is None:
+        from config import latitude, longitude, visualcross_key
+        # one attempt per run, the scheduler retries failed queries with backoff
+        weather = WeatherClient (latitude, longitude, visualcross_key, timeout = weather_timeout, retries = 0)
+    return weather
+
+@perf.timed ("query_weather")
 def query_weather ():
-    """Query weather information from visualcrossing.com"""
-    jsonData = None
+    """Query weather information from visualcrossing.com, the result is saved
+       as snapshot when the query succeeded"""
+    cur_weather, fcst_weather = get_weather ().query ()
+    if cur_weather is not None:
+        save_snapshot (cache_path ("weather.json"), cur_weather, fcst_weather)
+    return cur_weather, fcst_weather
 
-    try:
-        ResultBytes = urllib.request.urlopen(f"https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/{latitude}%2C{longitude}?unitGroup=metric&include=current&key={visualcross_key}&contentType=json")
-        # Parse the results as JSON
-        jsonData = json.load(ResultBytes)
-    except urllib.error.HTTPError as e:
-        ErrorInfo= e.read().decode()
-        print('Error code: ', e.code, ErrorInfo)
-    except  urllib.error.URLError as e:
-        ErrorInfo= e.read().decode()
-        print('Error code: ', e.code,ErrorInfo)
-
-    if jsonData:
-        return jsonData ['currentConditions'], jsonData ['days'][:7]
-    else:
-        return None, None
+history = None # created by get_history () on first use
+
+def get_history ():
+    """Return the hourly weather history kept in the cache folder"""
+    global history
+
+    if history is None:
+        history = WeatherHistory (cache_path ("weather_history.bin"))
+    return history
+
+def load_weather ():
+    """Return (current conditions, forecast, age in seconds) of the last
+       successful query, or (None, None, None) if there is none"""
+    cur_weather, fcst_weather, fetched = load_snapshot (cache_path ("weather.json"))
+    if fetched is None:
+        return None, None, None
+    return cur_weather, fcst_weather, max (0, time.time () - fetched)
 
 def get_loc_name ():
-    return reverse_geocode.get ((float(latitude), float(longitude)))
+    """Name the configured location, reverse_geocode is only loaded when the
+       coordinates are not in the local cache yet"""
+    from config import latitude, longitude
 
-def toggle_pihole (status):
+    path = cache_path ("geocode.json")
+    coordinates = [float(latitude), float(longitude)]
+    try:
+        with open (path) as f:
+            cached = json.load (f)
+        if cached ['coordinates'] == coordinates:
+            return cached ['location']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    import reverse_geocode # builds its city KD-tree, takes seconds on the Pi
+    location = reverse_geocode.get (tuple(coordinates))
     try:
-        ResultBytes = urllib.request.urlopen(f"{pihole_url}/admin/api.php?{'enable' if status else 'disable'}&auth={pihole_key}")
-    except urllib.error.HTTPError as e:
-        ErrorInfo= e.read().decode()
-        print('Error code: ', e.code, ErrorInfo)
-    except  urllib.error.URLError as e:
-        ErrorInfo= e.read().decode()
-        print('Error code: ', e.code,ErrorInfo)
+        with open (path + '.tmp', 'w') as f:
+            json.dump ({'coordinates': coordinates, 'location': location}, f)
+        os.replace (path + '.tmp', path)
+    except (OSError, TypeError) as e:
+        print ('Cannot cache location: ', e)
+    return location
+
+pihole = None # created by get_pihole () when the control screen is first used
+
+def get_pihole ():
+    """Return the Pi-hole client, reading its settings on first use"""
+    global pihole
+
+    if pihole is None:
+        from config import pihole_url, pihole_key
+        pihole = PiholeClient (pihole_url, pihole_key)
+    return pihole
+
+def toggle_pihole (status):
+    """Enable or disable Pi-hole blocking in the background"""
+    get_pihole ().start ()
+    get_pihole ().set (status)
+
+def cache_path (name):
+    """Path of a file in the local cache folder, created on demand"""
+    os.makedirs (cache_dir, exist_ok = True)
+    return os.path.join (cache_dir, name)
 
 def rpad_str (org_str, l):
     """Right pad with spaces"""
@@ -56,9 +117,12 @@ def lpad_str (org_str, l):
     else:
         return org_str[-l:]
 
+last_notice = None
+
 def draw_notice (screen, text):
-    """Draw a screen with notice"""
-    global shift, shift_dir
+    """Draw a screen with notice, return None as it does not need redraws by
+       itself and the rectangles which changed since the last frame"""
+    global last_notice
 
     SCR_W    = screen.get_width()  - 5
     SCR_H    = screen.get_height() - 5
@@ -67,7 +131,16 @@ def draw_notice (screen, text):
     # fill the screen with a color to wipe away anything from last frame
     screen.fill(BLACK)
 
-    font   = pygame.font.SysFont ('Calibri', int((SCR_H / 7)*0.6), False, False)
+    font   = fonts.get_font ('Calibri', int((SCR_H / 7)*0.6), False, False)
 
-    txt = font.render(text, True, WHITE)
-    screen.blit (txt, [MARGIN_W, MARGIN_H])
+    txt  = fonts.render_text (font, text, WHITE)
+    rect = screen.blit (txt, [MARGIN_W, MARGIN_H])
+
+    if last_notice is None:
+        dirty = [rect]
+    elif last_notice [0] != text:
+        dirty = [rect.union (last_notice [1])]
+    else:
+        dirty = []
+    last_notice = (text, rect)
+    return None, dirty
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+
+import time, collections, threading, array, json, os, socket, contextlib, functools
+
+class PhaseTimer:
+    """Measure how long consecutive phases take, i.e. of the startup"""
+
+    def __init__ (self):
+        self.start  = time.monotonic ()
+        self.last   = self.start
+        self.phases = [] # (name, seconds)
+
+    def mark (self, name):
+        """End the running phase and record it under name"""
+        now = time.monotonic ()
+        self.phases.append ((name, now - self.last))
+        self.last = now
+
+    def total (self):
+        return self.last - self.start
+
+    def report (self, title = "Startup"):
+        """Return the recorded phases as printable lines"""
+        lines = [f"{title}: {self.total () * 1000:.0f} ms"]
+        for name, seconds in self.phases:
+            lines.append (f"  {name:<20} {seconds * 1000:8.1f} ms")
+        return "\n".join (lines)
+
+class RateCounter:
+    """Count an amount per second over a sliding window"""
+
+    def __init__ (self, window = 5):
+        self.window  = window
+        self.samples = collections.deque () # (monotonic time, amount)
+        self.total   = 0
+
+    def add (self, amount):
+        now = time.monotonic ()
+        self.samples.append ((now, amount))
+        self.total += amount
+        while self.samples and self.samples [0][0] < now - self.window:
+            self.samples.popleft ()
+
+    def rate (self):
+        """Amount per second over the last window"""
+        now = time.monotonic ()
+        return sum (a for t, a in self.samples if t >= now - self.window) / self.window
+
+class RingBuffer:
+    """Fixed-size buffer of the last samples, backed by an array of doubles"""
+
+    def __init__ (self, size = 300):
+        self.data  = array.array ('d', bytes (8 * size))
+        self.size  = size
+        self.count = 0 # samples added so far
+
+    def add (self, value):
+        self.data [self.count % self.size] = value
+        self.count += 1
+
+    def values (self):
+        return self.data [:min (self.count, self.size)]
+
+    def summary (self):
+        """Mean, 95th percentile and max of the buffered samples"""
+        values = sorted (self.values ())
+        if not values:
+            return {'n': 0, 'mean': 0, 'p95': 0, 'max': 0}
+        return {'n'   : self.count,
+                'mean': sum (values) / len (values),
+                'p95' : values [min (len (values) - 1, int (len (values) * 0.95))],
+                'max' : values [-1]}
+
+class Profiler:
+    """Time the phases of the main loop and of background jobs into ring
+       buffers, draw them as an overlay and export them periodically.
+
+       export_to is a file path, rewritten atomically with the latest numbers,
+       or "unix:/path" of a datagram socket the numbers are sent to."""
+
+    def __init__ (self, enabled = False, size = 300, export_to = None, export_interval = 10):
+        self.enabled         = enabled
+        self.overlay         = False
+        self.size            = size
+        self.phases          = {} # name -> RingBuffer of seconds
+        self.lock            = threading.Lock ()
+        self.frame_times     = RingBuffer (size)
+        self.last_frame      = None
+        self.export_to       = export_to
+        self.export_interval = export_interval
+        self.next_export     = time.monotonic () + export_interval
+        self.extras          = {} # other numbers to show and export, i.e. pixels pushed
+
+    def record (self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock: # background jobs record from their threads
+            buf = self.phases.get (name)
+            if buf is None:
+                buf = self.phases [name] = RingBuffer (self.size)
+            buf.add (seconds)
+
+    @contextlib.contextmanager
+    def phase (self, name):
+        """Time the enclosed block as phase name"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter ()
+        try:
+            yield
+        finally:
+            self.record (name, time.perf_counter () - start)
+
+    def frame (self):
+        """Mark the end of a frame"""
+        if not self.enabled:
+            return
+        now = time.perf_counter ()
+        if self.last_frame is not None:
+            self.frame_times.add (now - self.last_frame)
+        self.last_frame = now
+
+    def fps (self):
+        mean = self.frame_times.summary () ['mean']
+        return 1 / mean if mean > 0 else 0
+
+    def summary (self):
+        """All numbers as a dict of plain values, times in ms"""
+        with self.lock:
+            phases = {name: buf.summary () for name, buf in self.phases.items ()}
+        for s in phases.values ():
+            for k in ('mean', 'p95', 'max'):
+                s [k] = round (s [k] * 1000, 3)
+        return {'time': time.time (), 'fps': round (self.fps (), 2), 'phases': phases, **self.extras}
+
+    def draw_overlay (self, screen):
+        """Draw FPS and the mean/p95 time of each phase at the top left corner,
+           return the rectangle drawn on or None when the overlay is off"""
+        if not (self.enabled and self.overlay):
+            return None
+        import pygame, fonts
+
+        font  = fonts.get_font ('Calibri', max (10, screen.get_height () // 20))
+        s     = self.summary ()
+        lines = [f"{s ['fps']:.1f} fps"] + [f"{name} {p ['mean']:.1f}/{p ['p95']:.1f} ms" for name, p in sorted (s ['phases'].items ())]
+        lines += [f"{k} {v}" for k, v in self.extras.items ()]
+        texts = [font.render (line, True, (0, 255, 0)) for line in lines]
+        rect  = pygame.Rect (0, 0, max (t.get_width () for t in texts) + 4, sum (t.get_height () for t in texts) + 4)
+        screen.fill ((0, 0, 0), rect)
+        y = 2
+        for t in texts:
+            screen.blit (t, (2, y))
+            y += t.get_height ()
+        return rect
+
+    def export (self, force = False):
+        """Write the numbers to export_to once every export_interval seconds"""
+        if not (self.enabled and self.export_to) or (not force and time.monotonic () < self.next_export):
+            return
+        self.next_export = time.monotonic () + self.export_interval
+        data = json.dumps (self.summary ())
+        try:
+            if self.export_to.startswith ('unix:'):
+                with socket.socket (socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+                    sock.setblocking (False)
+                    sock.sendto (data.encode (), self.export_to [5:])
+            else:
+                with open (self.export_to + '.tmp', 'w') as f:
+                    f.write (data + '\n')
+                os.replace (self.export_to + '.tmp', self.export_to)
+        except OSError:
+            pass # nobody listening or disk trouble, metrics are best effort
+
+profiler = Profiler () # shared instance, configured and enabled by clock.py
+
+def memory_kb (field):
+    """VmRSS (resident now) or VmHWM (peak resident) of this process in kB,
+       None where /proc is not available"""
+    try:
+        with open ('/proc/self/status') as f:
+            for line in f:
+                if line.startswith (field + ':'):
+                    return int (line.split () [1])
+    except OSError:
+        pass
+    return None
+
+def reset_peak_rss ():
+    """Restart the peak resident size at the current one, so that the peak of
+       the next operation can be read with memory_kb ('VmHWM'). Returns False
+       where this is not supported, the peak then covers the whole run."""
+    try:
+        with open ('/proc/self/clear_refs', 'w') as f:
+            f.write ('5')
+        return True
+    except OSError:
+        return False
+
+def timed (name):
+    """Decorator timing every call of a function as phase name of the shared
+       profiler, i.e. for background jobs"""
+    def decorator (func):
+        @functools.wraps (func)
+        def wrapper (*args, **kwargs):
+            with profiler.phase (name):
+                return func (*args, **kwargs)
+        return wrapper
+    return decorator
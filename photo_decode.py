@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import pygame
+import os, struct, threading, time
+import perf
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+try:
+    from config import decode_budget_mb
+except ImportError:
+    decode_budget_mb = 96
+
+class PhotoTooLarge (ValueError):
+    """Decoding the photo would take more memory than the budget"""
+
+stats = {'decoded': 0, 'drafted': 0, 'refused': 0}
+lock  = threading.Lock () # one decode at a time, so that the peak is of one photo
+
+def fitted (size, fit):
+    """Size of an image of the given size scaled, keeping its aspect, to fit
+       into fit"""
+    r = min (fit[0] / size[0], fit[1] / size[1])
+    return max (1, int(size[0] * r)), max (1, int(size[1] * r))
+
+def image_size (path):
+    """Width and height from the header of a JPEG or PNG file, None for other
+       formats or broken headers"""
+    try:
+        with open (path, 'rb') as f:
+            head = f.read (24)
+            if head [:8] == b'\x89PNG\r\n\x1a\n':
+                return struct.unpack ('>II', head [16:24])
+            if head [:2] != b'\xff\xd8':
+                return None
+            f.seek (2)
+            while True:
+                marker = f.read (2)
+                while len (marker) == 2 and marker [1] == 0xff: # fill bytes
+                    marker = marker [1:] + f.read (1)
+                if len (marker) < 2 or marker [0] != 0xff:
+                    return None
+                kind = marker [1]
+                if kind == 0x01 or 0xd0 <= kind <= 0xd8: # markers without a segment
+                    continue
+                length = struct.unpack ('>H', f.read (2)) [0]
+                if 0xc0 <= kind <= 0xcf and kind not in (0xc4, 0xc8, 0xcc): # start of frame
+                    h, w = struct.unpack ('>xHH', f.read (5))
+                    return w, h
+                f.seek (length - 2, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+
+def check_budget (size, budget):
+    if size [0] * size [1] * 4 > budget:
+        stats ['refused'] += 1
+        raise PhotoTooLarge (f"{size[0]}x{size[1]} needs more than {budget // (1024 * 1024)} MB to decode")
+
+def decode_pillow (path, fit, budget):
+    """Decode with Pillow, letting the JPEG decoder scale down by up to 1/8
+       (DCT scaling) before any pixel is stored"""
+    with Image.open (path) as im:
+        full = im.size
+        if im.format == 'JPEG':
+            im.draft ('RGB', fitted (full, fit)) # keeps at least the fitted size
+            if im.size != full:
+                stats ['drafted'] += 1
+        decoded = im.size
+        check_budget (decoded, budget)
+        im = im.convert ('RGB')
+    target = fitted (full, fit)
+    if im.size != target:
+        im = im.resize (target, Image.BILINEAR)
+    return pygame.image.frombuffer (im.tobytes (), im.size, 'RGB'), full, decoded
+
+def decode_pygame (path, fit, budget):
+    """Decode the whole photo with pygame and scale it down, refusing it
+       before decoding if its header tells it is too large"""
+    size = image_size (path)
+    if size is not None:
+        check_budget (size, budget)
+    photo = pygame.image.load (path)
+    full  = photo.get_size ()
+    try:
+        return pygame.transform.smoothscale (photo, fitted (full, fit)), full, full
+    except ValueError: # smoothscale only takes 24/32 bit surfaces
+        return pygame.transform.scale (photo, fitted (full, fit)), full, full
+
+def load_scaled (path, fit, budget = None):
+    """Decode a photo scaled, keeping its aspect, to fit into fit, with at
+       most budget bytes (decode_budget_mb by default) of decoded pixels.
+       Prints the peak resident size of the decode, so that photos which are
+       too large for the Pi can be found."""
+    budget = budget or decode_budget_mb * 1024 * 1024
+    with lock:
+        exact = perf.reset_peak_rss ()
+        start = time.perf_counter ()
+        surface = None
+        if Image is not None:
+            try:
+                surface, full, decoded = decode_pillow (path, fit, budget)
+            except PhotoTooLarge:
+                raise
+            except (OSError, ValueError, SyntaxError): # a format Pillow does not know
+                surface = None
+        if surface is None:
+            surface, full, decoded = decode_pygame (path, fit, budget)
+        seconds = time.perf_counter () - start
+        peak    = perf.memory_kb ('VmHWM')
+
+    stats ['decoded'] += 1
+    perf.profiler.record ('photo_decode', seconds)
+    print (f"Decoded {os.path.basename (path)} {full[0]}x{full[1]} at {decoded[0]}x{decoded[1]} in {seconds * 1000:.0f} ms, "
+           + (f"peak RSS {'' if exact else 'so far '}{peak / 1024:.0f} MB" if peak is not None else "peak RSS unknown"))
+    return surface
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+import os, json, random
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tga')
+
+class PhotoIndex:
+    """Persistent index of the image files below a folder.
+
+       Files are kept with their mtime and size, folders with their mtime. A
+       delta scan stats every folder but only lists the ones whose mtime has
+       changed since the last scan, so an unchanged library costs one stat per
+       folder instead of one per file."""
+
+    def __init__ (self, root, index_path = None):
+        self.root       = root
+        self.index_path = index_path
+        self.files      = {} # relative path -> (mtime, size)
+        self.dirs       = {} # relative path -> mtime
+        self.failed     = {} # relative path -> (mtime, size) it could not be shown with, not saved
+        self.listeners  = []
+        self.load ()
+
+    def load (self):
+        """Load the index saved by a previous run, if any"""
+        if not self.index_path:
+            return
+        try:
+            with open (self.index_path) as f:
+                data = json.load (f)
+            if data.get ('root') == self.root:
+                self.files = {k: tuple(v) for k, v in data ['files'].items ()}
+                self.dirs  = data ['dirs']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def save (self):
+        """Write the index atomically next to its final location"""
+        if not self.index_path:
+            return
+        tmp = self.index_path + '.tmp'
+        try:
+            with open (tmp, 'w') as f:
+                json.dump ({'root': self.root, 'files': self.files, 'dirs': self.dirs}, f)
+            os.replace (tmp, self.index_path)
+        except OSError as e:
+            print ('Cannot save photo index: ', e)
+
+    def scan (self):
+        """Bring the index up to date, return (added, removed) relative paths"""
+        added, removed = [], []
+        seen_dirs = set ()
+        pending   = ['']
+
+        by_dir, subdirs = {}, {}
+        for name in self.files:
+            by_dir.setdefault (os.path.dirname (name), set ()).add (name)
+        for rel in self.dirs:
+            if rel:
+                subdirs.setdefault (os.path.dirname (rel), []).append (rel)
+
+        while pending:
+            rel  = pending.pop ()
+            path = os.path.join (self.root, rel)
+            try:
+                mtime = os.stat (path).st_mtime
+            except OSError:
+                continue
+            seen_dirs.add (rel)
+
+            if self.dirs.get (rel) == mtime:
+                # unchanged folder, only descend into the subfolders we know
+                pending.extend (subdirs.get (rel, ()))
+                continue
+
+            known = by_dir.get (rel, set ())
+            try:
+                entries = list (os.scandir (path))
+            except OSError:
+                continue
+            for entry in entries:
+                name = os.path.join (rel, entry.name)
+                try:
+                    if entry.is_dir ():
+                        pending.append (name)
+                    elif entry.is_file () and entry.name.lower ().endswith (IMAGE_EXTS):
+                        st = entry.stat ()
+                        if name not in self.files:
+                            added.append (name)
+                        self.files [name] = (st.st_mtime, st.st_size)
+                        known.discard (name)
+                except OSError:
+                    continue
+            for name in known:
+                del self.files [name]
+                removed.append (name)
+            self.dirs [rel] = mtime
+
+        # forget folders which disappeared together with their files
+        for rel in [d for d in self.dirs if d not in seen_dirs]:
+            del self.dirs [rel]
+        for name in [f for f in self.files if os.path.dirname (f) not in self.dirs]:
+            del self.files [name]
+            removed.append (name)
+
+        if added or removed:
+            for listener in self.listeners:
+                listener (added, removed)
+        return added, removed
+
+    def fail (self, name):
+        """Skip a file which cannot be shown until it changes on disk, or
+           until the next run, i.e. with a larger decode budget"""
+        if name in self.files:
+            self.failed [name] = self.files [name]
+
+    def usable (self, name):
+        """True if a file is indexed and did not fail in its current version"""
+        return name in self.files and self.failed.get (name) != self.files [name]
+
+    def path (self, name):
+        """Absolute path of an indexed file"""
+        return os.path.join (self.root, name)
+
+    def __contains__ (self, name):
+        return name in self.files
+
+    def __len__ (self):
+        return len (self.files)
+
+class ShuffleBag:
+    """Endless iterator over an index which shows every photo once before
+       repeating any of them, skipping the ones which failed. Picking is O(1)
+       and never touches the disk. It stops when no photo is usable."""
+
+    def __init__ (self, index):
+        self.index = index
+        self.bag   = []
+        index.listeners.append (self.update)
+
+    def update (self, added, removed):
+        """Put newly indexed files at random places in the remaining bag,
+           removed ones are skipped when they come up"""
+        for name in added:
+            self.bag.append (name)
+            i = random.randrange (len (self.bag))
+            self.bag [i], self.bag [-1] = self.bag [-1], self.bag [i]
+
+    def __iter__ (self):
+        return self
+
+    def __next__ (self):
+        while self.bag:
+            name = self.bag.pop ()
+            if self.index.usable (name):
+                return name
+        self.bag = [name for name in self.index.files if self.index.usable (name)]
+        if not self.bag:
+            raise StopIteration
+        random.shuffle (self.bag)
+        return self.bag.pop ()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import http.client, urllib.parse, json, threading, time
+import perf
+
+class PiholeClient:
+    """Pi-hole control in a background thread.
+
+       Requests go through one keep-alive connection. set () only records the
+       wanted state and returns at once; rapid toggles coalesce, so only the
+       last wanted state is sent. The real status is polled every
+       poll_interval seconds and cached in status (None while unknown)."""
+
+    def __init__ (self, url, key, timeout = 5, poll_interval = 30):
+        parts              = urllib.parse.urlsplit (url)
+        self.https         = parts.scheme == 'https'
+        self.host          = parts.hostname
+        self.port          = parts.port
+        self.path          = parts.path.rstrip ('/') + '/admin/api.php'
+        self.key           = key
+        self.timeout       = timeout
+        self.poll_interval = poll_interval
+        self.status        = None   # True when blocking is enabled
+        self.wanted        = None   # state to send, None when nothing is pending
+        self.sending       = False
+        self.conn          = None
+        self.lock          = threading.Lock ()
+        self.wake          = threading.Event ()
+        self.thread        = None
+        self.scheduler     = None
+        self.next_poll     = 0
+
+    def connect (self):
+        if self.conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conn = cls (self.host, self.port, timeout = self.timeout)
+        return self.conn
+
+    def request (self, command):
+        """Send one API command, return the status it reports"""
+        query = urllib.parse.urlencode ({command: '', 'auth': self.key})
+        start = time.perf_counter ()
+        try:
+            conn = self.connect ()
+            conn.request ('GET', f"{self.path}?{query}", headers = {'Connection': 'keep-alive'})
+            response = conn.getresponse ()
+            body     = response.read () # read it all so that the connection can be reused
+            if response.status != 200:
+                raise OSError (f"HTTP {response.status}")
+            status = json.loads (body).get ('status')
+            if status not in ('enabled', 'disabled'):
+                raise ValueError (f"unexpected answer {body [:80]!r}")
+            return status == 'enabled'
+        except (OSError, ValueError, AttributeError, http.client.HTTPException):
+            # drop the connection, the next request opens a new one
+            if self.conn is not None:
+                self.conn.close ()
+                self.conn = None
+            raise
+        finally:
+            perf.profiler.record ('pihole_request', time.perf_counter () - start)
+
+    def set (self, enabled):
+        """Ask for blocking to be enabled or disabled, without waiting"""
+        with self.lock:
+            self.wanted = enabled
+        if self.scheduler is not None:
+            self.scheduler.trigger ('pihole')
+        else:
+            self.wake.set ()
+
+    def pending (self):
+        """True while a wanted state is not applied yet"""
+        return self.wanted is not None or self.sending
+
+    def sync (self):
+        """Send the wanted state if any, else poll the status when it is due"""
+        with self.lock:
+            wanted, self.wanted = self.wanted, None
+            self.sending = wanted is not None
+        try:
+            if wanted is not None:
+                self.status    = self.request ('enable' if wanted else 'disable')
+                self.next_poll = time.monotonic () + self.poll_interval
+            elif time.monotonic () >= self.next_poll:
+                self.next_poll = time.monotonic () + self.poll_interval
+                self.status    = self.request ('status')
+        except (OSError, ValueError, AttributeError, http.client.HTTPException) as e:
+            print ('Cannot reach Pi-hole: ', e)
+            self.next_poll = time.monotonic () + self.poll_interval
+            with self.lock:
+                if wanted is not None and self.wanted is None:
+                    self.wanted = wanted # try again at the next poll
+            self.status = None
+        finally:
+            self.sending = False
+
+    def run (self):
+        """Function to run in a separate thread"""
+        while True:
+            self.wake.clear ()
+            self.sync ()
+            self.wake.wait (max (0, self.next_poll - time.monotonic ()))
+
+    def start (self, scheduler = None):
+        """Run the client as job of a scheduler, or else in its own thread"""
+        if self.scheduler is not None or self.thread is not None:
+            return
+        if scheduler is not None:
+            self.scheduler = scheduler
+            scheduler.every ('pihole', self.sync, self.poll_interval)
+        else:
+            self.thread = threading.Thread (target = self.run, daemon = True)
+            self.thread.start ()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import heapq, itertools, queue, random, threading, time
+import perf
+
+WORKERS = 2 # worker threads, so that a slow network job does not hold up the others
+
+class Job:
+    """A periodic job, see Scheduler.every ()"""
+
+    def __init__ (self, name, func, interval, jitter, retry, max_retry):
+        self.name      = name
+        self.func      = func
+        self.interval  = interval  # seconds between runs after a success
+        self.jitter    = jitter    # up to this many seconds are added at random
+        self.retry     = retry     # first delay after a failure, doubled on every further one
+        self.max_retry = max_retry
+        self.failures  = 0
+        self.due       = 0         # monotonic time of the next run
+        self.running   = False
+        self.rerun     = False     # triggered while running
+
+    def next_delay (self):
+        if self.failures:
+            delay = min (self.retry * 2 ** (self.failures - 1), self.max_retry)
+        else:
+            delay = self.interval
+        return delay + random.uniform (0, self.jitter)
+
+class Scheduler:
+    """Runs periodic jobs kept on a timer heap in a small pool of worker
+       threads, and hands their results to the render loop through a
+       thread-safe queue. A job never runs twice at the same time.
+
+       A job fails when it raises, it is then retried with exponential backoff,
+       so jobs should not retry by themselves. Whatever it returns is queued as
+       (name, result) unless it is None."""
+
+    def __init__ (self, workers = WORKERS):
+        self.heap    = []  # (due, sequence, job)
+        self.jobs    = {}  # name -> Job
+        self.seq     = itertools.count ()
+        self.cond    = threading.Condition ()
+        self.results = queue.Queue ()
+        self.notify  = None # called after anything was queued, i.e. to wake the render loop
+        self.workers = workers
+        self.threads = []
+
+    def every (self, name, func, interval, jitter = 0, retry = None, max_retry = None, delay = 0):
+        """Run func every interval seconds, the first time after delay"""
+        job = Job (name, func, interval, jitter,
+                   retry if retry is not None else interval,
+                   max_retry if max_retry is not None else interval)
+        with self.cond:
+            self.jobs [name] = job
+            self.push (job, time.monotonic () + delay)
+        return job
+
+    def push (self, job, due):
+        job.due = due
+        heapq.heappush (self.heap, (due, next (self.seq), job))
+        self.cond.notify ()
+
+    def trigger (self, name):
+        """Run a job as soon as possible instead of at its due time"""
+        with self.cond:
+            job = self.jobs.get (name)
+            if job is None:
+                return
+            if job.running:
+                job.rerun = True
+            elif job.due > time.monotonic ():
+                self.push (job, time.monotonic ())
+
+    def post (self, name, value):
+        """Queue a result from any thread, i.e. a button event"""
+        self.results.put ((name, value))
+        if self.notify is not None:
+            self.notify ()
+
+    def drain (self):
+        """Return everything queued since the last call, without waiting"""
+        items = []
+        while True:
+            try:
+                items.append (self.results.get_nowait ())
+            except queue.Empty:
+                return items
+
+    def run (self):
+        """Function to run in each worker thread"""
+        while True:
+            with self.cond:
+                while True:
+                    now = time.monotonic ()
+                    if self.heap and self.heap [0][0] <= now:
+                        due, _, job = heapq.heappop (self.heap)
+                        if due == job.due: # else it was rescheduled by trigger ()
+                            job.running = True
+                            self.cond.notify () # another worker may take the next job
+                            break
+                        continue
+                    self.cond.wait (self.heap [0][0] - now if self.heap else None)
+
+            try:
+                with perf.profiler.phase (job.name):
+                    result = job.func ()
+                job.failures = 0
+                if result is not None:
+                    self.post (job.name, result)
+            except Exception as e:
+                job.failures += 1
+                print (f"Job {job.name} failed: ", e)
+
+            with self.cond:
+                job.running = False
+                self.push (job, time.monotonic () + (0 if job.rerun else job.next_delay ()))
+                job.rerun = False
+
+    def start (self):
+        if not self.threads:
+            for _ in range (self.workers):
+                thread = threading.Thread (target = self.run, daemon = True)
+                thread.start ()
+                self.threads.append (thread)
+
+jobs = Scheduler () # shared instance, started by clock.py
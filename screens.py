@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import importlib, time
+
+RELEASE_AFTER = 300 # seconds a screen may stay hidden before its resources are released
+
+class Screen:
+    """A screen, see ScreenRegistry.register ()"""
+
+    def __init__ (self, name, module, draw, cadence, release_after):
+        self.name          = name
+        self.module_name   = module
+        self.draw          = draw
+        self.cadence       = cadence        # redraw delay when draw () does not ask for one
+        self.release_after = release_after
+        self.module        = None           # imported module while loaded
+        self.last_shown    = None           # monotonic time of the last draw
+
+    def load (self, surface):
+        """Import the module of the screen and set it up on first use"""
+        if self.module is None and self.module_name is not None:
+            self.module = importlib.import_module (self.module_name)
+            if hasattr (self.module, 'init'):
+                self.module.init (surface)
+        return self.module
+
+    def release (self):
+        """Let the module drop its surfaces, caches and threads until the
+           screen is shown again"""
+        if self.module is not None and hasattr (self.module, 'release'):
+            self.module.release ()
+        self.module = None
+
+class ScreenRegistry:
+    """Screens by name, in the order they were registered.
+
+       Each screen module is only imported, and its init (surface) called,
+       when the screen is first drawn. The module stays imported afterwards,
+       but its release () hook is called once the screen was hidden for
+       release_after seconds so that the memory it holds does not add up as
+       screens are added. show (), if the module has one, is called whenever
+       the screen becomes the shown one."""
+
+    def __init__ (self):
+        self.screens = {} # name -> Screen
+        self.shown   = None
+
+    def register (self, name, module, draw, cadence = None, release_after = RELEASE_AFTER):
+        """Register a screen drawn by draw (module, surface, events), which
+           returns the delay until the next redraw and the changed rectangles
+           like the draw_screen () of the screen modules. module is the name of
+           the module to import, or None for screens without one."""
+        self.screens [name] = Screen (name, module, draw, cadence, release_after)
+
+    def draw (self, name, surface, events, show = True):
+        """Draw a screen, loading it if needed. show is False when the screen
+           is drawn for someone else, i.e. by the frame server, so that its
+           show () hook is not called."""
+        screen = self.screens [name]
+        module = screen.load (surface)
+        if show and name != self.shown and hasattr (module, 'show'):
+            module.show ()
+        self.shown        = name
+        screen.last_shown = time.monotonic ()
+
+        delay, dirty = screen.draw (module, surface, events)
+        return (screen.cadence if delay is None else delay), dirty
+
+    def release_idle (self):
+        """Release the screens which were hidden for long enough"""
+        now = time.monotonic ()
+        for screen in self.screens.values ():
+            if screen.module is not None and screen.name != self.shown and \
+               screen.release_after is not None and now - screen.last_shown >= screen.release_after:
+                screen.release ()
+
+    def loaded (self):
+        """Names of the screens which hold resources"""
+        return [name for name, screen in self.screens.items () if screen.module is not None]
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+import pygame
+import os, sys, mmap, struct, hashlib
+
+MAGIC  = b'PCT1'
+HEADER = struct.Struct ('<4sHH') # magic, width, height, then width*height RGB bytes
+
+class ThumbCache:
+    """On-disk cache of display-sized photos.
+
+       Entries are keyed by source path, source mtime and target size and hold
+       the scaled pixels as raw RGB, which are memory-mapped straight into a
+       pygame surface on a hit. The mtime of an entry is bumped on every hit
+       so the least recently used ones are evicted first once the cache grows
+       above max_bytes."""
+
+    def __init__ (self, folder, max_bytes = 512 * 1024 * 1024):
+        self.folder    = folder
+        self.max_bytes = max_bytes
+        self.stats     = {'hits': 0, 'misses': 0, 'errors': 0, 'evictions': 0,
+                          'bytes_read': 0, 'bytes_written': 0, 'bytes': 0, 'entries': 0}
+        os.makedirs (folder, exist_ok = True)
+        for entry in os.scandir (folder):
+            if entry.name.endswith ('.raw'):
+                self.stats ['bytes']   += entry.stat ().st_size
+                self.stats ['entries'] += 1
+
+    def entry_path (self, path, size):
+        """File holding the entry of a source photo scaled into size"""
+        mtime = os.stat (path).st_mtime_ns
+        key   = f"{os.path.abspath (path)}\0{mtime}\0{size[0]}x{size[1]}"
+        return os.path.join (self.folder, hashlib.sha1 (key.encode ()).hexdigest () + '.raw')
+
+    def read (self, entry):
+        """Map an entry into a surface, None if it is missing or broken"""
+        try:
+            with open (entry, 'rb') as f, mmap.mmap (f.fileno (), 0, access = mmap.ACCESS_READ) as mm:
+                magic, w, h = HEADER.unpack_from (mm)
+                if magic != MAGIC or len (mm) != HEADER.size + w * h * 3:
+                    raise ValueError ('bad entry')
+                # frombuffer shares the mapped memory, copy it out before unmapping
+                view    = memoryview (mm)
+                mapped  = pygame.image.frombuffer (view [HEADER.size:], (w, h), 'RGB')
+                surface = mapped.convert () if pygame.display.get_surface () else mapped.copy ()
+                del mapped
+                view.release ()
+            os.utime (entry)
+            self.stats ['bytes_read'] += HEADER.size + w * h * 3
+            return surface
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error):
+            self.stats ['errors'] += 1
+            self.remove (entry)
+            return None
+
+    def write (self, entry, surface):
+        """Store a surface as a new entry, evicting old ones if needed"""
+        w, h = surface.get_size ()
+        data = HEADER.pack (MAGIC, w, h) + pygame.image.tobytes (surface, 'RGB')
+        tmp  = entry + '.tmp'
+        try:
+            with open (tmp, 'wb') as f:
+                f.write (data)
+            os.replace (tmp, entry)
+        except OSError as e:
+            print ('Cannot write thumbnail: ', e)
+            return
+        self.stats ['bytes_written'] += len (data)
+        self.stats ['bytes']         += len (data)
+        self.stats ['entries']       += 1
+        self.evict ()
+
+    def remove (self, entry):
+        try:
+            size = os.stat (entry).st_size
+            os.remove (entry)
+        except OSError:
+            return
+        self.stats ['bytes']   -= size
+        self.stats ['entries'] -= 1
+
+    def evict (self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        if self.stats ['bytes'] <= self.max_bytes:
+            return
+        entries = sorted ((e for e in os.scandir (self.folder) if e.name.endswith ('.raw')),
+                          key = lambda e: e.stat ().st_mtime)
+        for e in entries:
+            if self.stats ['bytes'] <= self.max_bytes:
+                break
+            self.remove (e.path)
+            self.stats ['evictions'] += 1
+
+    def get (self, path, size, loader):
+        """Return the photo at path scaled into size, calling loader (path, size)
+           to produce it on a miss"""
+        entry   = self.entry_path (path, size)
+        surface = self.read (entry)
+        if surface is not None:
+            self.stats ['hits'] += 1
+            return surface
+        self.stats ['misses'] += 1
+        surface = loader (path, size)
+        self.write (entry, surface)
+        return surface
+
+    def __contains__ (self, key):
+        path, size = key
+        return os.path.exists (self.entry_path (path, size))
+
+def warm_up (size):
+    """Pre-render the whole photo library for the given screen size"""
+    import digitalframe_display as frame, helper
+    from photo_index import PhotoIndex
+
+    library = PhotoIndex (frame.digiframe_dir, helper.cache_path ("photo_index.json"))
+    library.scan ()
+    library.save ()
+    cache = frame.get_thumbs ()
+    fit   = frame.fit_size (size)
+
+    for n, name in enumerate (sorted (library.files)):
+        path = library.path (name)
+        if (path, fit) in cache:
+            continue
+        if cache.stats ['bytes'] >= cache.max_bytes:
+            print (f"Cache is full after {n} of {len (library)} photos, raise thumb_cache_mb to keep all.")
+            break
+        try:
+            cache.get (path, fit, frame.scale_photo)
+        except Exception as e:
+            print ('Cannot load photo: ', path, e)
+    print (cache.stats)
+
+if __name__ == "__main__":
+    # Usage: thumb_cache.py [WIDTHxHEIGHT], defaults to the Waveshare 3.2" panel
+    pygame.init ()
+    w, h = (sys.argv [1] if len (sys.argv) > 1 else "320x240").split ('x')
+    warm_up ((int (w), int (h)))
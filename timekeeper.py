@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+import math, time
+from datetime import datetime
+
+class WallClock:
+    """Time to display, derived from the monotonic clock anchored to the wall
+       clock. Slow frames cannot make it drift as nothing is counted, and it is
+       re-anchored every resync seconds to follow NTP adjustments."""
+
+    def __init__ (self, wall = time.time, mono = time.monotonic, resync = 30):
+        self.wall   = wall
+        self.mono   = mono
+        self.resync = resync
+        self.anchor ()
+
+    def anchor (self):
+        self.anchor_mono = self.mono ()
+        self.anchor_wall = self.wall ()
+
+    def time (self):
+        """Seconds since the epoch"""
+        elapsed = self.mono () - self.anchor_mono
+        if elapsed >= self.resync:
+            self.anchor ()
+            elapsed = 0
+        return self.anchor_wall + elapsed
+
+    def now (self):
+        return datetime.fromtimestamp (self.time ())
+
+    def until_next_second (self, margin = 0.002):
+        """Delay to the next second boundary, plus a margin so that a redraw
+           scheduled with it lands after the boundary and not just before"""
+        return 1 - self.time () % 1 + margin
+
+class FakeClock:
+    """Clocks moved by hand, see simulate (). The monotonic clock runs skew
+       too fast, the wall clock is the true time plus an offset which NTP
+       steps and slews."""
+
+    def __init__ (self, start = 1792300000.25, skew = 20e-6):
+        self.start  = start
+        self.skew   = skew
+        self.true   = 0 # seconds elapsed
+        self.offset = 0 # wall clock minus true time
+        self.slew   = 0 # change of the offset per second
+
+    def wall (self):
+        return self.start + self.true + self.offset
+
+    def mono (self):
+        return 1000 + self.true * (1 + self.skew)
+
+    def advance (self, seconds):
+        self.true   += seconds
+        self.offset += self.slew * seconds
+
+def simulate (seconds = 600, fps = 30, render = 0.005, flip = 0.003,
+              stalls = ((10, 0.4), (95, 2.5), (301, 0.9)),
+              steps  = ((60, 0.7), (420, -1.2)),
+              slews  = ((150, 500e-6), (270, -500e-6), (390, 0))):
+    """Run the redraw loop of the clock screen, scheduled as in clock.py,
+       against a wall clock which NTP steps and slews at (second, seconds)
+       and (second, rate), with frames which stall for (second, seconds).
+
+       A frame is late for as long as the wall clock has left the second it
+       shows, early for as long as it has not reached it yet. Return the
+       largest lateness and earliness, the seconds skipped and shown twice,
+       all of them but for frames which stalled or showed an unfollowed step,
+       and the longest time the shown time took to follow a step."""
+    fake   = FakeClock ()
+    clock  = WallClock (fake.wall, fake.mono)
+    stalls, steps, slews = dict (stalls), dict (steps), dict (slews)
+    stats  = {'late': 0, 'early': 0, 'skipped': 0, 'repeated': 0, 'follow': 0}
+    last   = None # (second, wall time of the flip, counted) of the frame on screen
+    stepped     = None # true time of a step the shown time did not follow yet
+    next_redraw = 0
+    while fake.true < seconds:
+        # sleep as the main loop does, never waking before the redraw is due
+        timeout = math.ceil ((next_redraw - fake.mono ()) * 1000)
+        if timeout > 0:
+            fake.advance (timeout / 1000)
+        woke = fake.mono ()
+
+        second = int (fake.true)
+        if second in steps:
+            fake.offset += steps.pop (second)
+            stepped = fake.true
+            last    = None # the wall clock left the shown second in a jump
+        if second in slews:
+            fake.slew = slews.pop (second)
+
+        # draw_clock (): read the time, render, ask for the next second
+        anchor = clock.anchor_mono
+        shown  = int (clock.time ())
+        fake.advance (render)
+        delay  = clock.until_next_second ()
+        if stepped is not None and clock.anchor_mono != anchor:
+            stats ['follow'] = max (stats ['follow'], fake.true - stepped)
+            stepped = None
+        fake.advance (flip)
+
+        # the frame on screen is replaced now
+        if last is not None and last [2]:
+            stats ['late']  = max (stats ['late'], fake.wall () - (last [0] + 1))
+            stats ['early'] = max (stats ['early'], last [0] - last [1])
+        stall   = stalls.pop (second, 0)
+        counted = stall == 0 and stepped is None
+        if last is not None and last [2] and counted and clock.anchor_mono == anchor:
+            stats ['skipped']  += max (0, shown - last [0] - 1)
+            stats ['repeated'] += shown == last [0]
+        last = (shown, fake.wall (), counted)
+        fake.advance (stall) # a slow frame, i.e. photo loading
+        next_redraw = max (fake.mono () + max (0, delay), woke + 1 / fps)
+    if stepped is not None:
+        stats ['follow'] = max (stats ['follow'], fake.true - stepped)
+    return stats
+
+if __name__ == "__main__":
+    fps   = 30
+    stats = simulate (fps = fps)
+    print (f"late {stats ['late'] * 1000:.1f} ms, early {stats ['early'] * 1000:.1f} ms, "
+           f"{stats ['skipped']} seconds skipped, {stats ['repeated']} shown twice, "
+           f"steps followed within {stats ['follow']:.1f} s")
+    # a re-anchor which moves the shown time back delays the next second by a frame
+    assert stats ['late'] < 2 / fps and stats ['early'] < 1 / fps, "a second was shown off the wall clock"
+    assert stats ['skipped'] == 0 and stats ['repeated'] == 0, "the redraws missed the second boundaries"
+    assert stats ['follow'] <= WallClock ().resync + 1, "an NTP step was not followed"
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import urllib.request, urllib.parse, urllib.error
+import json, gzip, os, random, time
+
+BASE_URL = "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline"
+
+# Only the fields the screens show, the full timeline payload is a lot bigger
+ELEMENTS = ('datetime', 'conditions', 'temp', 'feelslike', 'humidity', 'dew',
+            'cloudcover', 'windspeed', 'uvindex', 'sunrise', 'sunset')
+FCST_DAYS = 7
+
+class WeatherError (Exception):
+    """Weather could not be fetched, retryable tells if another try may help"""
+    def __init__ (self, message, retryable = True):
+        super ().__init__ (message)
+        self.retryable = retryable
+
+class WeatherClient:
+    """Visual Crossing timeline client with timeout, gzip and retries"""
+
+    def __init__ (self, latitude, longitude, key, timeout = 10, retries = 3, backoff = 2,
+                  base_url = BASE_URL):
+        self.latitude  = latitude
+        self.longitude = longitude
+        self.key       = key
+        self.timeout   = timeout  # seconds per request
+        self.retries   = retries  # extra tries after the first one
+        self.backoff   = backoff  # base delay in seconds, doubled on every retry
+        self.base_url  = base_url
+
+    def url (self):
+        """Timeline URL of today plus the next days, current conditions included"""
+        query = urllib.parse.urlencode ({
+            'unitGroup'  : 'metric',
+            'include'    : 'days,current',
+            'elements'   : ','.join (ELEMENTS),
+            'key'        : self.key,
+            'contentType': 'json',
+        })
+        location = urllib.parse.quote (f"{self.latitude},{self.longitude}")
+        return f"{self.base_url}/{location}/next{FCST_DAYS - 1}days?{query}"
+
+    def fetch (self):
+        """Do one request and return the decoded JSON, raise WeatherError"""
+        request = urllib.request.Request (self.url (), headers = {'Accept-Encoding': 'gzip'})
+        try:
+            with urllib.request.urlopen (request, timeout = self.timeout) as response:
+                body = response.read ()
+                if response.headers.get ('Content-Encoding', '') == 'gzip':
+                    body = gzip.decompress (body)
+            return json.loads (body)
+        except urllib.error.HTTPError as e:
+            info = e.read ().decode (errors = 'replace')
+            raise WeatherError (f"HTTP {e.code}: {info}", retryable = e.code == 429 or e.code >= 500)
+        except urllib.error.URLError as e:
+            raise WeatherError (f"URL error: {e.reason}")
+        except (OSError, EOFError, ValueError) as e: # timeouts, resets, broken gzip or JSON
+            raise WeatherError (f"{type (e).__name__}: {e}")
+
+    def query (self):
+        """Return (current conditions, forecast days) or (None, None), retrying
+           with jittered exponential backoff"""
+        for attempt in range (self.retries + 1):
+            try:
+                data = self.fetch ()
+                return data ['currentConditions'], data ['days'][:FCST_DAYS]
+            except (KeyError, TypeError) as e:
+                print ('Unexpected weather data: ', e)
+                return None, None
+            except WeatherError as e:
+                print ('Cannot query weather: ', e)
+                if not e.retryable or attempt == self.retries:
+                    return None, None
+            time.sleep (random.uniform (0, self.backoff * 2 ** attempt))
+
+def save_snapshot (path, current, days):
+    """Atomically store the last good weather with the time it was fetched"""
+    tmp = path + '.tmp'
+    try:
+        with open (tmp, 'w') as f:
+            json.dump ({'time': time.time (), 'currentConditions': current, 'days': days}, f)
+            f.flush ()
+            os.fsync (f.fileno ())
+        os.replace (tmp, path)
+    except OSError as e:
+        print ('Cannot save weather snapshot: ', e)
+
+def load_snapshot (path):
+    """Return (current conditions, forecast days, fetch time) saved by
+       save_snapshot, or (None, None, None)"""
+    try:
+        with open (path) as f:
+            data = json.load (f)
+        return data ['currentConditions'], data ['days'], data ['time']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, None, None
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import os, mmap, struct, math, time
+
+MAGIC    = b'PCH1'
+HEADER   = struct.Struct ('<4sIII')  # magic, capacity, count, index of the next record
+RECORD   = struct.Struct ('<dfff')   # epoch seconds, temperature, humidity, cloud cover
+FIELDS   = ('temp', 'humidity', 'cloudcover')
+CAPACITY = 30 * 24                   # hourly samples of 30 days
+
+class WeatherHistory:
+    """Ring buffer of hourly weather samples in a memory-mapped file of packed
+       records, so that it survives reboots at a fixed size.
+
+       A sample taken in the same hour as the newest one replaces it. version
+       changes with every sample, to find out if anything drawn from the
+       history is outdated."""
+
+    def __init__ (self, path, capacity = CAPACITY):
+        self.path     = path
+        self.capacity = capacity
+        self.version  = 0
+        size          = HEADER.size + capacity * RECORD.size
+
+        fd = os.open (path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fresh = os.fstat (fd).st_size != size
+            if fresh:
+                os.ftruncate (fd, size)
+            self.mm = mmap.mmap (fd, size)
+        finally:
+            os.close (fd)
+
+        magic, cap, self.count, self.head = HEADER.unpack_from (self.mm)
+        if fresh or magic != MAGIC or cap != capacity or self.count > capacity or self.head >= capacity:
+            if not fresh:
+                print ('Weather history reset: ', path)
+            self.count = self.head = 0
+            self.write_header ()
+
+    def write_header (self):
+        HEADER.pack_into (self.mm, 0, MAGIC, self.capacity, self.count, self.head)
+
+    def record (self, i):
+        """i-th sample, 0 is the oldest"""
+        slot = (self.head - self.count + i) % self.capacity
+        return RECORD.unpack_from (self.mm, HEADER.size + slot * RECORD.size)
+
+    def add (self, current, now = None):
+        """Store the temperature, humidity and cloud cover of the current
+           conditions reported by the weather query"""
+        now    = time.time () if now is None else now
+        values = []
+        for field in FIELDS:
+            try:
+                values.append (float (current [field]))
+            except (KeyError, TypeError, ValueError):
+                values.append (math.nan) # not reported, left as a gap
+        if self.count and int (self.record (self.count - 1)[0] // 3600) == int (now // 3600):
+            self.head = (self.head - 1) % self.capacity # same hour, replace the newest
+            self.count -= 1
+        RECORD.pack_into (self.mm, HEADER.size + self.head * RECORD.size, now, *values)
+        self.head  = (self.head + 1) % self.capacity
+        self.count = min (self.count + 1, self.capacity)
+        self.write_header ()
+        self.mm.flush ()
+        self.version += 1
+
+    def series (self, field, since = None):
+        """(time, value) of a field, oldest first, optionally only the samples
+           not older than since"""
+        n = FIELDS.index (field) + 1
+        samples = (self.record (i) for i in range (self.count))
+        return [(r [0], r [n]) for r in samples if since is None or r [0] >= since]
+
+    def __len__ (self):
+        return self.count
+
+    def close (self):
+        self.mm.close ()